@@ -0,0 +1,69 @@
+"""
+pytest 分析報告外掛
+測試透過 analysis_results fixture 保存分析結果，測試結束時輸出與直接執行模組相同的分析報告
+（終端、HTML 報告）以及 JSON 檔，CI 不需要為了分析報告再執行一次
+"""
+
+import html
+import json
+import os
+from typing import List, Dict, Any
+
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption("--analysis-json", default=None,
+                     help="將測試中保存的分析結果寫入此 JSON 檔")
+
+
+def pytest_configure(config):
+    # 模組名稱 -> (模組, 分析結果)
+    config._analysis_results = {}
+
+
+@pytest.fixture(scope="module")
+def analysis_results(request) -> Dict[str, Any]:
+    """目前測試模組的分析結果，內容由模組的 format_analysis_report 輸出"""
+    module = request.module
+    entry = request.config._analysis_results.setdefault(module.__name__, (module, {}))
+    return entry[1]
+
+
+def analysis_reports(config) -> Dict[str, List[str]]:
+    """以各模組的 format_analysis_report 產生報告文字"""
+    reports = {}
+    for name, (module, results) in config._analysis_results.items():
+        formatter = getattr(module, "format_analysis_report", None)
+        if results and formatter is not None:
+            try:
+                reports[name] = formatter(results)
+            except Exception as e:
+                reports[name] = [f"無法產生分析報告: {e}"]
+    return reports
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    for name, lines in analysis_reports(config).items():
+        terminalreporter.section(f"分析報告 ({name})")
+        for line in lines:
+            terminalreporter.write_line(line)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_html_results_summary(prefix, summary, postfix, session):
+    for name, lines in analysis_reports(session.config).items():
+        postfix.append(f"<h2>分析報告 ({html.escape(name)})</h2><pre>{html.escape(chr(10).join(lines))}</pre>")
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption("--analysis-json")
+    results = {name: results for name, (_, results) in session.config._analysis_results.items() if results}
+    if not path or not results or hasattr(session.config, "workerinput"):
+        return
+    
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, default=str)
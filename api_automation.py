@@ -4,20 +4,41 @@ from typing import List, Dict, Any
 import json
 import time
 
+from batch_query import run_queries
+from response_decoding import ACCEPT_ENCODING, DECODE_ERRORS, RecordStream, loads, wire_bytes
+
 class SWAPIClient:
     """Star Wars API 客戶端類別"""
     
-    def __init__(self, base_url: str = "https://swapi.info/api"):
+    def __init__(self, base_url: str = "https://swapi.info/api", incremental: bool = False):
         self.base_url = base_url
+        self.incremental = incremental  # 大型陣列邊下載邊逐筆解析（需安裝 ijson，節省記憶體但解碼較慢）
         self.session = requests.Session()
+        self.session.headers.update({"Accept": "application/json", "Accept-Encoding": ACCEPT_ENCODING})
+        self.transfer_stats = {"requests": 0, "wire_bytes": 0, "decoded_bytes": 0}
+    
+    def _get(self, endpoint: str, params: dict = None, stream: bool = False) -> requests.Response:
+        url = f"{self.base_url}/{endpoint}"
+        response = self.session.get(url, params=params, timeout=30, stream=stream)
+        response.raise_for_status()
+        self.transfer_stats["requests"] += 1
+        return response
+    
+    def _record_transfer(self, response: requests.Response, decoded_bytes: int):
+        self.transfer_stats["decoded_bytes"] += decoded_bytes
+        self.transfer_stats["wire_bytes"] += wire_bytes(response) or decoded_bytes
         
     def _make_request(self, endpoint: str, params: dict = None) -> Dict[Any, Any]:
         """發送 API 請求並處理錯誤"""
         try:
-            url = f"{self.base_url}/{endpoint}"
-            response = self.session.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
+            response = self._get(endpoint, params)
+            # 直接從解壓縮後的位元組解析，不先轉成字串
+            try:
+                data = loads(response.content)
+            except DECODE_ERRORS as e:
+                # 與 requests 的 response.json() 相同，解析失敗視為請求失敗
+                raise requests.RequestException(f"無法解析 {endpoint} 的 JSON 回應: {e}", response=response) from e
+            self._record_transfer(response, len(response.content))
             
             # 如果回傳的是陣列，包裝成標準格式
             if isinstance(data, list):
@@ -27,6 +48,11 @@ class SWAPIClient:
         except requests.RequestException as e:
             print(f"API 請求失敗: {e}")
             raise
+    
+    def iter_page_records(self, endpoint: str, page: int = 1) -> RecordStream:
+        """讀取單一頁面的紀錄（需以 with 關閉回應或讀完整頁）"""
+        response = self._get(endpoint, params={"page": page}, stream=True)
+        return RecordStream(response, incremental=self.incremental)
             
     def get_all_pages(self, endpoint: str) -> List[Dict[Any, Any]]:
         """獲取所有分頁的資料"""
@@ -35,10 +61,13 @@ class SWAPIClient:
         
         while True:
             try:
-                data = self._make_request(endpoint, params={"page": page})
-                all_results.extend(data.get("results", []))
+                records = self.iter_page_records(endpoint, page)
+                with records.response:
+                    page_results = list(records)
+                self._record_transfer(records.response, records.bytes_read)
+                all_results.extend(page_results)
                 
-                if not data.get("next"):
+                if not records.next:
                     break
                     
                 page += 1
@@ -50,6 +79,14 @@ class SWAPIClient:
                 
         return all_results
     
+    def get_transfer_stats(self) -> Dict[str, Any]:
+        """傳輸位元組數（壓縮後）與解壓縮後的位元組數"""
+        stats = dict(self.transfer_stats)
+        stats["compression_ratio"] = (
+            round(stats["decoded_bytes"] / stats["wire_bytes"], 2) if stats["wire_bytes"] else None
+        )
+        return stats
+    
     def get_films(self) -> List[Dict[Any, Any]]:
         """獲取所有電影資料"""
         return self.get_all_pages("films")
@@ -81,95 +118,105 @@ class StarWarsAnalyzer:
             self._cache[data_type] = method()
         return self._cache[data_type]
     
-    def get_species_count_in_episode_6(self) -> int:
-        """獲取第六部電影中不同種族的數量"""
-        films = self._get_cached_data("films")
-        people = self._get_cached_data("people")
-        
-        # 找到第六部電影
-        episode_6 = None
-        for film in films:
-            if film.get("episode_id") == 6:
-                episode_6 = film
-                break
+    def run_queries(self, queries: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        一次執行多個查詢，回傳 {查詢名稱: 結果}
         
-        if not episode_6:
+        查詢依資源合併規劃，每個資源的快取資料只掃描一次，衍生欄位、條件判斷與關聯結果在查詢間共用（規格見 batch_query）
+        """
+        return run_queries(queries, self._get_cached_data)
+    
+    @staticmethod
+    def species_in_episode_queries(episode_id: int = 6) -> Dict[str, Dict[str, Any]]:
+        """指定集數的電影，以及出現在該電影中的角色的種族"""
+        return {
+            f"episode_{episode_id}": {"resource": "films", "filter": [("episode_id", "==", episode_id)], "top": 1},
+            f"species_in_episode_{episode_id}": {
+                "resource": "people",
+                "join": {"on": "url", "resource": "films", "filter": [("episode_id", "==", episode_id)],
+                         "values": "characters"},
+                "group": {"by": "species"},
+            },
+        }
+    
+    @staticmethod
+    def films_by_episode_query() -> Dict[str, Any]:
+        """依集數排序的電影"""
+        return {
+            "resource": "films",
+            "sort": {"by": "episode_id", "default": 0},
+            "select": {"episode_id": "episode_id", "title": "title", "release_date": "release_date"},
+        }
+    
+    @staticmethod
+    def high_power_vehicles_query(min_horsepower: int = 1000) -> Dict[str, Any]:
+        """最高速度（只取數字部分）超過指定值的車輛，由快到慢排序"""
+        return {
+            "resource": "vehicles",
+            "derive": {"speed_value": ("digits", "max_atmosphering_speed")},
+            "filter": [("speed_value", ">", min_horsepower)],
+            "sort": {"by": "speed_value", "desc": True},
+            "select": {"name": "name", "model": "model", "max_speed": "max_atmosphering_speed",
+                       "speed_value": "speed_value"},
+        }
+    
+    @staticmethod
+    def _species_count(results: Dict[str, Any], episode_id: int = 6) -> int:
+        if not results[f"episode_{episode_id}"]:
             raise ValueError("找不到第六部電影")
         
-        # 獲取第六部電影中的角色 URLs
-        episode_6_characters = set(episode_6.get("characters", []))
-        
-        # 找到出現在第六部的角色們的種族
-        species_in_episode_6 = set()
-        
-        for person in people:
-            person_url = person.get("url")
-            if person_url in episode_6_characters:
-                person_species = person.get("species", [])
-                species_in_episode_6.update(person_species)
-        
         # 如果沒有指定種族，視為人類
-        if not species_in_episode_6:
-            species_in_episode_6.add("Human")
-        
-        return len(species_in_episode_6)
+        return len(results[f"species_in_episode_{episode_id}"]) or 1
+    
+    def get_species_count_in_episode_6(self) -> int:
+        """獲取第六部電影中不同種族的數量"""
+        return self._species_count(self.run_queries(self.species_in_episode_queries(6)))
     
     def get_films_sorted_by_episode(self) -> List[Dict[str, Any]]:
         """依據電影集數排序電影名字"""
-        films = self._get_cached_data("films")
-        
-        sorted_films = sorted(films, key=lambda x: x.get("episode_id", 0))
-        
-        return [
-            {
-                "episode_id": film.get("episode_id"),
-                "title": film.get("title"),
-                "release_date": film.get("release_date")
-            }
-            for film in sorted_films
-        ]
+        return self.run_queries({"sorted_films": self.films_by_episode_query()})["sorted_films"]
     
     def get_high_power_vehicles(self, min_horsepower: int = 1000) -> List[Dict[str, Any]]:
         """獲取馬力超過指定值的車輛"""
-        vehicles = self._get_cached_data("vehicles")
-        
-        high_power_vehicles = []
-        
-        for vehicle in vehicles:
-            try:
-                # 處理馬力資料（可能包含非數字字符）
-                max_speed = vehicle.get("max_atmosphering_speed", "unknown")
-                if max_speed == "unknown" or max_speed == "n/a":
-                    continue
-                
-                # 移除非數字字符並轉換為整數
-                speed_value = int(''.join(filter(str.isdigit, str(max_speed))))
-                
-                if speed_value > min_horsepower:
-                    high_power_vehicles.append({
-                        "name": vehicle.get("name"),
-                        "model": vehicle.get("model"),
-                        "max_speed": max_speed,
-                        "speed_value": speed_value
-                    })
-                    
-            except (ValueError, TypeError):
-                continue
-        
-        return sorted(high_power_vehicles, key=lambda x: x["speed_value"], reverse=True)
+        return self.run_queries({"vehicles": self.high_power_vehicles_query(min_horsepower)})["vehicles"]
+    
+    def run_report(self, min_horsepower: int = 1000) -> Dict[str, Any]:
+        """以一次批次查詢產生三項分析結果（每個資源只掃描一次）"""
+        queries = dict(self.species_in_episode_queries(6),
+                       sorted_films=self.films_by_episode_query(),
+                       high_power_vehicles=self.high_power_vehicles_query(min_horsepower))
+        results = self.run_queries(queries)
+        return {
+            "species_count": self._species_count(results),
+            "sorted_films": results["sorted_films"],
+            "high_power_vehicles": results["high_power_vehicles"],
+        }
+
+
+class _FakeResponse:
+    """測試用的回應：以固定內容模擬 requests.Response 的 content 與 iter_content"""
+    
+    def __init__(self, content: bytes):
+        self.content = content
+    
+    def iter_content(self, chunk_size: int):
+        return (self.content[i:i + chunk_size] for i in range(0, len(self.content), chunk_size))
 
 
 class TestStarWarsAPI:
     """API 自動化測試類別"""
     
     @pytest.fixture(scope="class")
-    def analyzer(self):
+    def analyzer(self, analysis_results):
         """測試用的分析器實例"""
-        return StarWarsAnalyzer()
+        analyzer = StarWarsAnalyzer()
+        yield analyzer
+        analysis_results["transfer_stats"] = analyzer.client.get_transfer_stats()
     
-    def test_species_count_in_episode_6(self, analyzer):
+    def test_species_count_in_episode_6(self, analyzer, analysis_results):
         """測試：第六部電影中有多少不同種族的人"""
         species_count = analyzer.get_species_count_in_episode_6()
+        analysis_results["species_count"] = species_count
         
         print(f"\n第六部電影中出現了 {species_count} 個不同的種族")
         
@@ -178,9 +225,10 @@ class TestStarWarsAPI:
         assert species_count > 0
         assert species_count < 100  # 合理的上限檢查
     
-    def test_films_sorted_by_episode(self, analyzer):
+    def test_films_sorted_by_episode(self, analyzer, analysis_results):
         """測試：依據電影集數排序電影名字"""
         sorted_films = analyzer.get_films_sorted_by_episode()
+        analysis_results["sorted_films"] = sorted_films
         
         print(f"\n依集數排序的電影列表:")
         for i, film in enumerate(sorted_films, 1):
@@ -194,9 +242,10 @@ class TestStarWarsAPI:
         episode_ids = [film['episode_id'] for film in sorted_films]
         assert episode_ids == sorted(episode_ids)
     
-    def test_high_power_vehicles(self, analyzer):
+    def test_high_power_vehicles(self, analyzer, analysis_results):
         """測試：找出馬力超過1000的車輛"""
         high_power_vehicles = analyzer.get_high_power_vehicles(1000)
+        analysis_results["high_power_vehicles"] = high_power_vehicles
         
         print(f"\n馬力超過1000的車輛:")
         if high_power_vehicles:
@@ -219,6 +268,149 @@ class TestStarWarsAPI:
         assert "results" in films
         
         print(f"\nAPI 連接測試通過，共找到 {len(films['results'])} 部電影")
+    
+    def test_record_stream_decoding(self):
+        """測試：頂層陣列回應直接作為紀錄，分頁物件回應保留 next"""
+        records = [{"name": f"X-{i}", "speed": "1200" if i % 2 else "n/a", "films": ["a", "b"], "ratio": i / 4}
+                   for i in range(50)]
+        body = json.dumps(records, ensure_ascii=False).encode()
+        
+        stream = RecordStream(_FakeResponse(b"  " + body))
+        assert list(stream) == records and stream.next is None
+        assert stream.bytes_read == len(body) + 2
+        
+        paged = RecordStream(_FakeResponse(b'{"next": "https://example.com/?page=2", "results": [{"a": 1}]}'))
+        assert list(paged) == [{"a": 1}] and paged.next == "https://example.com/?page=2"
+        
+        # 逐筆解析（未安裝 ijson 時退回整份解析）結果相同
+        stream = RecordStream(_FakeResponse(body), incremental=True, chunk_size=16)
+        assert list(stream) == records and stream.bytes_read == len(body)
+    
+    def test_invalid_json_raises_request_exception(self):
+        """測試：回應被截斷或不是 JSON 時，以 RequestException 回報"""
+        client = SWAPIClient()
+        for content in (b'[{"name": "Luke"', b"<html>502 Bad Gateway</html>"):
+            response = _FakeResponse(content)
+            response.raise_for_status = lambda: None
+            client.session.get = lambda url, **kwargs: response
+            with pytest.raises(requests.RequestException):
+                client._make_request("films")
+    
+    def test_record_stream_matches_json_loads(self):
+        """測試：預設與逐筆解析的回應解碼結果都與 json.loads 相同（含大量小紀錄與單一大型紀錄）"""
+        records = [{"name": f"X-{i}", "films": [f"https://swapi.info/api/films/{j}" for j in range(3)],
+                    "ratio": i / 4, "pilot": None, "label": "星際大戰 \u2728"} for i in range(500)]
+        records.append({"name": "large", "crawl": "x" * (256 * 1024)})
+        body = json.dumps(records).encode()
+        expected = json.loads(body)
+        
+        assert list(RecordStream(_FakeResponse(body))) == expected
+        assert list(RecordStream(_FakeResponse(body), incremental=True, chunk_size=4096)) == expected
+        
+        paged = json.dumps({"next": None, "results": records}).encode()
+        assert list(RecordStream(_FakeResponse(paged))) == json.loads(paged)["results"]
+    
+    @pytest.mark.benchmark
+    def test_record_stream_decoding_benchmark(self):
+        """效能量測：預設的回應解碼與標準函式庫 json.loads 的耗時（只輸出數字，pytest --benchmarks 執行）"""
+        records = [{"name": f"X-{i}", "films": [f"https://swapi.info/api/films/{j}" for j in range(5)], "ratio": i / 4}
+                   for i in range(20000)]
+        records.append({"name": "large", "crawl": "x" * (4 * 1024 * 1024)})
+        body = json.dumps(records).encode()
+        
+        def best_of(func, runs=5):
+            timings = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - started)
+            return min(timings)
+        
+        stream_time = best_of(lambda: list(RecordStream(_FakeResponse(body))))
+        baseline_time = best_of(lambda: json.loads(body))
+        print(f"\n回應解碼 {len(body) / 1024 / 1024:.1f} MB: RecordStream {stream_time:.3f} 秒，"
+              f"json.loads {baseline_time:.3f} 秒")
+    
+    def test_batch_queries_scan_each_resource_once(self):
+        """測試：批次查詢的每項結果符合預期（含相同值與缺少種族的角色），且每個資源只讀取一次"""
+        analyzer = StarWarsAnalyzer()
+        analyzer._cache = {
+            "films": [
+                {"episode_id": 6, "title": "Return of the Jedi", "release_date": "1983-05-25",
+                 "characters": ["people/1", "people/2", "people/4", "people/5", "people/6"]},
+                {"episode_id": 4, "title": "A New Hope", "release_date": "1977-05-25", "characters": ["people/3"]},
+            ],
+            "people": [
+                {"url": "people/1", "species": []},
+                {"url": "people/2", "species": ["species/2", "species/3"]},
+                {"url": "people/3", "species": ["species/4"]},
+                {"url": "people/4"},
+                {"url": "people/5", "species": None},
+                {"url": "people/6", "species": ["species/2"]},
+            ],
+            "vehicles": [
+                {"name": "A", "model": "a", "max_atmosphering_speed": "1,200"},
+                {"name": "B", "model": "b", "max_atmosphering_speed": "n/a"},
+                {"name": "C", "model": "c", "max_atmosphering_speed": "30000"},
+                {"name": "D", "model": "d", "max_atmosphering_speed": "1000"},
+                {"name": "E", "model": "e", "max_atmosphering_speed": "1200"},
+            ],
+        }
+        expected_films = [
+            {"episode_id": 4, "title": "A New Hope", "release_date": "1977-05-25"},
+            {"episode_id": 6, "title": "Return of the Jedi", "release_date": "1983-05-25"},
+        ]
+        # 速度相同的 A 與 E 維持原本的順序；1000 不超過門檻，n/a 沒有數字
+        expected_vehicles = [
+            {"name": "C", "model": "c", "max_speed": "30000", "speed_value": 30000},
+            {"name": "A", "model": "a", "max_speed": "1,200", "speed_value": 1200},
+            {"name": "E", "model": "e", "max_speed": "1200", "speed_value": 1200},
+        ]
+        
+        # 沒有種族欄位或為 None 的角色不計入任何種族
+        assert analyzer.run_queries(analyzer.species_in_episode_queries(6))["species_in_episode_6"] == {
+            "species/2": 2, "species/3": 1
+        }
+        assert analyzer.get_species_count_in_episode_6() == 2
+        assert analyzer.get_films_sorted_by_episode() == expected_films
+        assert analyzer.get_high_power_vehicles(1000) == expected_vehicles
+        
+        loads = []
+        cached = analyzer._get_cached_data
+        analyzer._get_cached_data = lambda data_type: loads.append(data_type) or cached(data_type)
+        assert analyzer.run_report(1000) == {
+            "species_count": 2,
+            "sorted_films": expected_films,
+            "high_power_vehicles": expected_vehicles,
+        }
+        assert sorted(loads) == ["films", "people", "vehicles"]
+
+
+def format_analysis_report(results: Dict[str, Any]) -> List[str]:
+    """將分析結果整理成報告文字（只包含已完成的項目）"""
+    lines = []
+    if "species_count" in results:
+        lines.append("1. 第六部電影中的種族數量")
+        lines.append(f"第六部電影中出現了 {results['species_count']} 個不同的種族")
+    
+    if "sorted_films" in results:
+        lines.append("2. 按集數排序電影")
+        for i, film in enumerate(results["sorted_films"], 1):
+            lines.append(f"{i}. 第{film['episode_id']}集: {film['title']}")
+    
+    if "high_power_vehicles" in results:
+        lines.append("3. 馬力超過1000的車輛")
+        if results["high_power_vehicles"]:
+            for i, vehicle in enumerate(results["high_power_vehicles"], 1):
+                lines.append(f"{i}. {vehicle['name']} - 最高速度: {vehicle['max_speed']}")
+        else:
+            lines.append("沒有找到馬力超過1000的車輛")
+    
+    if results.get("transfer_stats", {}).get("requests"):
+        stats = results["transfer_stats"]
+        lines.append(f"傳輸: {stats['requests']} 個請求，{stats['wire_bytes'] / 1024:.1f} KB"
+                     f"（解壓縮後 {stats['decoded_bytes'] / 1024:.1f} KB）")
+    return lines
 
 
 if __name__ == "__main__":
@@ -226,27 +418,12 @@ if __name__ == "__main__":
     print("=== Star Wars API 自動化分析 ===")
     
     analyzer = StarWarsAnalyzer()
+    results = {}
     
     try:
-        # 1. 分析第六部電影的種族數量
-        print("\n1. 分析第六部電影中的種族數量...")
-        species_count = analyzer.get_species_count_in_episode_6()
-        print(f"第六部電影中出現了 {species_count} 個不同的種族")
-        
-        # 2. 按集數排序電影
-        print("\n2. 按集數排序電影...")
-        sorted_films = analyzer.get_films_sorted_by_episode()
-        for i, film in enumerate(sorted_films, 1):
-            print(f"{i}. 第{film['episode_id']}集: {film['title']}")
-        
-        # 3. 找出高馬力車輛
-        print("\n3. 尋找馬力超過1000的車輛...")
-        high_power_vehicles = analyzer.get_high_power_vehicles(1000)
-        if high_power_vehicles:
-            for i, vehicle in enumerate(high_power_vehicles, 1):
-                print(f"{i}. {vehicle['name']} - 最高速度: {vehicle['max_speed']}")
-        else:
-            print("沒有找到馬力超過1000的車輛")
-            
+        results.update(analyzer.run_report(1000))
     except Exception as e:
         print(f"執行過程中發生錯誤: {e}")
+    results["transfer_stats"] = analyzer.client.get_transfer_stats()
+    
+    print("\n".join(format_analysis_report(results)))
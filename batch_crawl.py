@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+多儲存庫批次爬取
+以工作佇列與固定數量的瀏覽器 worker 對大量 GitHub 儲存庫執行合作者、Wireframe 與最後 commit 檢查，
+同一主機的導航依最小間隔排隊，結果逐筆以 JSON Lines 寫出；輸出檔同時作為檢查點，中斷後重新執行會略過已完成的儲存庫
+"""
+
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Iterable, Set, Callable
+from urllib.parse import urlparse
+
+import pytest
+
+from change_detection import ChangeDetector
+from selector_registry import SelectorRegistry
+from ui_automation import HahowRecruitAnalyzer, check_errors
+
+DEFAULT_OUTPUT = os.path.join("reports", "batch_results.jsonl")
+DEFAULT_MIN_INTERVAL = float(os.environ.get("UI_CRAWL_MIN_INTERVAL", "1.0"))
+
+
+class HostRateLimiter:
+    """
+    每個主機的請求最小間隔，多個 worker 共用；各 worker 依預約的時段依序等待
+    
+    涵蓋瀏覽器導航、會導航的連結點擊，以及變更偵測對 api.github.com 與 github.com 的請求
+    """
+    
+    def __init__(self, min_interval: float = DEFAULT_MIN_INTERVAL,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.min_interval = min_interval
+        self._clock = clock
+        self._sleep = sleep
+        self._next_slot = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, url: str) -> float:
+        """等待到此主機的下一個可用時段，回傳等待秒數"""
+        host = urlparse(url).netloc
+        with self._lock:
+            now = self._clock()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            self._sleep(delay)
+        return delay
+
+
+def normalize_repo(repo: str) -> str:
+    """將 owner/name 或完整網址統一為 https://github.com/owner/name"""
+    repo = repo.strip().rstrip("/")
+    if repo.endswith(".git"):
+        repo = repo[:-4]
+    if "://" not in repo:
+        repo = f"https://github.com/{repo.lstrip('/')}"
+    return repo
+
+
+def read_repos(lines: Iterable[str]) -> List[str]:
+    """讀取儲存庫清單（忽略空行與 # 註解，重複的只保留一次）"""
+    repos = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line:
+            repo = normalize_repo(line)
+            if repo not in repos:
+                repos.append(repo)
+    return repos
+
+
+def load_checkpoint(path: str, retry_failed: bool = False) -> Set[str]:
+    """
+    從既有的 JSONL 輸出找出已完成的儲存庫（中斷時寫到一半的最後一行會被忽略）
+    
+    重試失敗的儲存庫時新結果會附加在後面，同一儲存庫以最後一筆為準
+    """
+    statuses = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                statuses[record.get("repo")] = record.get("status")
+    except OSError:
+        pass
+    return {repo for repo, status in statuses.items() if status == "ok" or not retry_failed}
+
+
+class JsonLinesWriter:
+    """多執行緒共用的 JSONL 輸出，每筆寫入後立即同步到磁碟"""
+    
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+", encoding="utf-8")
+        self._lock = threading.Lock()
+        # 上次中斷在行中間時先補上換行，避免與下一筆結果黏在同一行
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+    
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+    
+    def close(self):
+        self._file.close()
+
+
+class BatchCrawler:
+    """固定數量的瀏覽器 worker 從佇列取出儲存庫分析，每個 worker 重用自己的瀏覽器"""
+    
+    def __init__(self, repos: List[str], output: str = DEFAULT_OUTPUT, workers: int = 4,
+                 min_interval: float = DEFAULT_MIN_INTERVAL, retry_failed: bool = False, **client_options):
+        done = load_checkpoint(output, retry_failed)
+        self.skipped = [repo for repo in repos if repo in done]
+        self.queue = queue.Queue()
+        for repo in repos:
+            if repo not in done:
+                self.queue.put(repo)
+        self.total = self.queue.qsize()
+        self.output = output
+        self.workers = max(1, min(workers, self.total or 1))
+        self.rate_limiter = HostRateLimiter(min_interval)
+        self.selector_registry = client_options.pop("selector_registry", None) or SelectorRegistry()
+        # 所有 worker 共用同一份分析結果快取，避免各自寫檔互相覆蓋
+        self.change_detector = (client_options.pop("change_detector", None)
+                                or ChangeDetector(rate_limiter=self.rate_limiter))
+        self.client_options = client_options
+        self.stats = {"ok": 0, "error": 0}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+    
+    def _new_analyzer(self) -> HahowRecruitAnalyzer:
+        return HahowRecruitAnalyzer(rate_limiter=self.rate_limiter, selector_registry=self.selector_registry,
+                                    change_detector=self.change_detector, **self.client_options)
+    
+    def _worker(self, index: int, writer: JsonLinesWriter):
+        analyzer = None
+        try:
+            while not self._stop.is_set():
+                try:
+                    repo = self.queue.get_nowait()
+                except queue.Empty:
+                    return
+                
+                started = time.monotonic()
+                record = {"repo": repo, "worker": index}
+                try:
+                    analyzer = analyzer or self._new_analyzer()
+                    record.update(analyzer.analyze(repo))
+                    # 各項檢查會吞下例外並回傳空結果，任一項失敗或沒有結果都記為失敗，--retry-failed 才會重試
+                    errors = record.pop("errors")
+                    if errors:
+                        record.update(status="error", check_errors=errors,
+                                      error="; ".join(f"{key}: {message}" for key, message in errors.items()))
+                    else:
+                        record["status"] = "ok"
+                except Exception as e:
+                    record.update(status="error", error=f"{type(e).__name__}: {e}")
+                # 瀏覽器可能已損壞，下一個儲存庫改用新的瀏覽器
+                if record["status"] == "error" and analyzer is not None:
+                    analyzer.close()
+                    analyzer = None
+                record["duration"] = round(time.monotonic() - started, 2)
+                record["finished_at"] = datetime.now().isoformat(timespec="seconds")
+                writer.write(record)
+                
+                with self._lock:
+                    self.stats[record["status"]] += 1
+                    finished = self.stats["ok"] + self.stats["error"]
+                mark = "✓" if record["status"] == "ok" else "✗"
+                print(f"[{finished}/{self.total}] {mark} {repo}（{record['duration']} 秒，worker {index}）", flush=True)
+        finally:
+            if analyzer is not None:
+                analyzer.close()
+    
+    def run(self) -> Dict[str, int]:
+        """執行爬取直到佇列清空；Ctrl+C 時各 worker 完成手上的儲存庫後停止"""
+        if self.skipped:
+            print(f"檢查點: 略過 {len(self.skipped)} 個已完成的儲存庫")
+        print(f"開始爬取 {self.total} 個儲存庫（{self.workers} 個 worker，"
+              f"每主機間隔 {self.rate_limiter.min_interval} 秒）-> {self.output}")
+        
+        writer = JsonLinesWriter(self.output)
+        threads = [
+            threading.Thread(target=self._worker, args=(index, writer), name=f"crawl-{index}", daemon=True)
+            for index in range(1, self.workers + 1)
+        ]
+        started = time.monotonic()
+        try:
+            for thread in threads:
+                thread.start()
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            print("\n收到中斷，等待進行中的儲存庫完成後停止（已完成的結果已寫入檢查點）")
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            writer.close()
+            self.selector_registry.save()
+        
+        elapsed = time.monotonic() - started
+        finished = self.stats["ok"] + self.stats["error"]
+        print(f"完成 {finished} 個儲存庫（成功 {self.stats['ok']}，失敗 {self.stats['error']}），"
+              f"耗時 {elapsed:.1f} 秒，平均每分鐘 {finished / max(elapsed, 1e-9) * 60:.1f} 個")
+        return dict(self.stats, remaining=self.queue.qsize())
+
+
+class TestBatchCrawl:
+    """批次爬取測試"""
+    
+    def test_batch_crawl_checkpoint_and_politeness(self, tmp_path):
+        """測試：批次爬取略過檢查點中已完成的儲存庫，且同一主機的導航依最小間隔排隊"""
+        assert read_repos(["hahow/hahow-recruit", "https://github.com/hahow/hahow-recruit.git", "# 註解", ""]) == [
+            "https://github.com/hahow/hahow-recruit"
+        ]
+        
+        output = tmp_path / "results.jsonl"
+        output.write_text('{"repo": "https://github.com/a/ok", "status": "ok"}\n'
+                          '{"repo": "https://github.com/a/failed", "status": "error"}\n{"repo": "https://gi')
+        writer = JsonLinesWriter(str(output))
+        writer.write({"repo": "https://github.com/a/new", "status": "ok"})
+        writer.close()
+        assert load_checkpoint(str(output)) == {
+            "https://github.com/a/ok", "https://github.com/a/failed", "https://github.com/a/new"
+        }
+        assert "https://github.com/a/failed" not in load_checkpoint(str(output), retry_failed=True)
+        
+        now, sleeps = [100.0], []
+        
+        def fake_sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+        
+        limiter = HostRateLimiter(min_interval=0.05, clock=lambda: now[0], sleep=fake_sleep)
+        delays = [limiter.wait("https://github.com/a/ok") for _ in range(3)]
+        delays.append(limiter.wait("https://example.com/"))
+        assert delays == pytest.approx([0, 0.05, 0.05, 0])
+        assert sleeps == pytest.approx([0.05, 0.05])
+    
+    def test_checkpoint_uses_last_record_per_repo(self, tmp_path):
+        """測試：同一儲存庫有多筆結果時，檢查點以最後一筆的狀態為準"""
+        output = tmp_path / "results.jsonl"
+        output.write_text('{"repo": "https://github.com/a/flaky", "status": "ok"}\n'
+                          '{"repo": "https://github.com/a/fixed", "status": "error"}\n'
+                          '{"repo": "https://github.com/a/flaky", "status": "error"}\n'
+                          '{"repo": "https://github.com/a/fixed", "status": "ok"}\n')
+        assert load_checkpoint(str(output), retry_failed=True) == {"https://github.com/a/fixed"}
+        assert load_checkpoint(str(output)) == {"https://github.com/a/flaky", "https://github.com/a/fixed"}
+    
+    def test_batch_crawl_records_failed_checks_as_errors(self, tmp_path):
+        """測試：任一項檢查失敗或沒有結果時，批次爬取記為失敗並可用 --retry-failed 重試"""
+        class FakeAnalyzer:
+            def analyze(self, repo):
+                results = {
+                    "contributors": {"count": 2, "names": ["a", "b"], "details": []},
+                    "wireframe": {"page_exists": True, "wireframe_found": True},
+                    "last_commit": {"author": "" if repo.endswith("missing") else "a"},
+                }
+                results["errors"] = check_errors(results)
+                return results
+            
+            def close(self):
+                pass
+        
+        output = str(tmp_path / "results.jsonl")
+        crawler = BatchCrawler(["https://github.com/a/ok", "https://github.com/a/missing"], output=output,
+                               workers=1, min_interval=0, change_detector=object(),
+                               selector_registry=SelectorRegistry(str(tmp_path / "selectors.json")))
+        crawler._new_analyzer = FakeAnalyzer
+        assert crawler.run() == {"ok": 1, "error": 1, "remaining": 0}
+        
+        records = {record["repo"]: record for record in map(json.loads, open(output, encoding="utf-8"))}
+        assert records["https://github.com/a/missing"]["check_errors"] == {"last_commit": "沒有取得結果"}
+        assert load_checkpoint(output, retry_failed=True) == {"https://github.com/a/ok"}
+    
+    def test_analyze_reports_failed_checks(self):
+        """測試：瀏覽器操作失敗時各項檢查回傳空結果，analyze 在 errors 中列出失敗原因"""
+        class BrokenClient:
+            def navigate_to(self, url):
+                raise RuntimeError("瀏覽器無法啟動")
+        
+        analyzer = HahowRecruitAnalyzer(detect_changes=False)
+        analyzer._client = BrokenClient()
+        results = analyzer.analyze("https://github.com/hahow/missing")
+        
+        assert results["contributors"]["count"] == 0 and results["last_commit"]["author"] == ""
+        assert set(results["errors"]) == {"contributors", "wireframe", "last_commit"}
+        assert all("瀏覽器無法啟動" in message for message in results["errors"].values())
+
+
+def main() -> int:
+    """主要執行函數"""
+    parser = argparse.ArgumentParser(description="批次分析多個 GitHub 儲存庫")
+    parser.add_argument("repos", nargs="?", default="-", help="儲存庫清單檔（每行 owner/name 或網址，預設讀取 stdin）")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"JSONL 輸出與檢查點（預設 {DEFAULT_OUTPUT}）")
+    parser.add_argument("--workers", type=int, default=4, help="同時使用的瀏覽器數量")
+    parser.add_argument("--min-interval", type=float, default=DEFAULT_MIN_INTERVAL,
+                        help=f"同一主機兩次導航的最小間隔秒數（預設 {DEFAULT_MIN_INTERVAL}）")
+    parser.add_argument("--retry-failed", action="store_true", help="重新爬取先前失敗的儲存庫")
+    parser.add_argument("--backend", default=None, help="瀏覽器後端（selenium 或 playwright）")
+    args = parser.parse_args()
+    
+    if args.repos == "-":
+        repos = read_repos(sys.stdin)
+    else:
+        with open(args.repos, encoding="utf-8") as f:
+            repos = read_repos(f)
+    
+    crawler = BatchCrawler(repos, output=args.output, workers=args.workers, min_interval=args.min_interval,
+                           retry_failed=args.retry_failed, backend=args.backend)
+    stats = crawler.run()
+    return 1 if stats["error"] or stats["remaining"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+批次查詢
+多個查詢規格（篩選、分組、關聯、排序、前 N 筆）一起規劃後執行：每個資源只讀取一次，
+欄位值、衍生欄位、條件篩選結果與關聯鍵集合在所有查詢間共用，只計算一次
+
+查詢規格範例：
+    {
+        "resource": "vehicles",
+        "derive": {"speed_value": ("digits", "max_atmosphering_speed")},
+        "filter": [("speed_value", ">", 1000)],
+        "join": {"on": "url", "resource": "films", "filter": [("episode_id", "==", 6)], "values": "vehicles"},
+        "group": {"by": "manufacturer"},
+        "sort": {"by": "speed_value", "desc": True, "default": 0},
+        "select": {"name": "name", "speed_value": "speed_value"},
+        "top": 10,
+    }
+"""
+
+import heapq
+import operator
+from collections import Counter
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "in": lambda value, options: value in options,
+    "contains": lambda value, item: isinstance(value, (list, tuple, set)) and item in value,
+}
+
+QUERY_KEYS = {"resource", "derive", "filter", "join", "group", "sort", "select", "top"}
+JOIN_KEYS = {"on", "resource", "derive", "filter", "join", "values"}
+
+
+def digits_value(value: Any) -> Optional[int]:
+    """取出字串中的數字（例如 "1,000" -> 1000）；unknown、n/a 或沒有數字時回傳 None"""
+    if value in (None, "unknown", "n/a"):
+        return None
+    digits = "".join(filter(str.isdigit, str(value)))
+    return int(digits) if digits else None
+
+
+def number_value(value: Any) -> Optional[float]:
+    """轉成數字（移除千分位逗號）；無法轉換時回傳 None"""
+    try:
+        return float(str(value).replace(",", ""))
+    except ValueError:
+        return None
+
+
+DERIVATIONS = {"digits": digits_value, "number": number_value}
+
+
+def _items(value: Any) -> List[Any]:
+    """清單欄位展開成多個值，單一值視為一個元素；缺少的欄位（None）沒有任何元素"""
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+class _Scan:
+    """
+    單一資源的資料，以及各查詢共用的欄位與篩選結果
+    
+    欄位值、衍生欄位與每個條件符合的列號各只計算一次；查詢以列號清單組合這些結果，
+    不需要在 Python 中逐列逐查詢判斷
+    """
+    
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self._columns = {}
+        self._selections = {}
+    
+    def column(self, field: Tuple) -> List[Any]:
+        """整個資源的欄位值（衍生欄位由來源欄位計算）"""
+        if field not in self._columns:
+            if field[0] == "field":
+                name = field[1]
+                self._columns[field] = [row.get(name) for row in self.rows]
+            else:
+                _, func, source = field
+                derive = DERIVATIONS[func]
+                self._columns[field] = [derive(value) for value in self.column(("field", source))]
+        return self._columns[field]
+    
+    def values(self, field: Tuple, indices: List[int]) -> List[Any]:
+        """指定列的欄位值；整欄尚未計算時只計算這些列"""
+        if field in self._columns:
+            column = self._columns[field]
+            return [column[i] for i in indices]
+        if field[0] == "field":
+            name = field[1]
+            return [self.rows[i].get(name) for i in indices]
+        _, func, source = field
+        derive = DERIVATIONS[func]
+        return [derive(value) for value in self.values(("field", source), indices)]
+    
+    def where(self, key: Tuple, value: Any) -> List[int]:
+        """符合條件的列號（由小到大）"""
+        if key not in self._selections:
+            field, op, _ = key
+            compare = OPERATORS[op]
+            column = self.column(field)
+            try:
+                selected = [i for i, actual in enumerate(column) if actual is not None and compare(actual, value)]
+            except TypeError:
+                selected = [i for i, actual in enumerate(column) if _safe_compare(compare, actual, value)]
+            self._selections[key] = selected
+        return self._selections[key]
+    
+    def joined(self, field: Tuple, key_id: str, keys: set) -> List[int]:
+        """欄位值（清單欄位為任一元素）出現在關聯鍵集合中的列號"""
+        selection_key = ("join", field, key_id)
+        if selection_key not in self._selections:
+            self._selections[selection_key] = [
+                i for i, value in enumerate(self.column(field))
+                if (any(item in keys for item in value) if isinstance(value, (list, tuple, set)) else value in keys)
+            ]
+        return self._selections[selection_key]
+
+
+def _safe_compare(compare: Callable, actual: Any, value: Any) -> bool:
+    try:
+        return actual is not None and bool(compare(actual, value))
+    except TypeError:
+        return False
+
+
+def _intersect(selections: List[List[int]]) -> List[int]:
+    """多個遞增列號清單的交集，從最短的清單開始"""
+    selections = sorted(selections, key=len)
+    result = selections[0]
+    for other in selections[1:]:
+        if not result:
+            break
+        members = set(other)
+        result = [i for i in result if i in members]
+    return result
+
+
+class _Query:
+    """一個查詢（或關聯子查詢）的規格"""
+    
+    def __init__(self, name: str, spec: Dict[str, Any], key_id: str = None):
+        self.name = name
+        self.key_id = key_id  # 關聯子查詢的結果以此 ID 提供給其他資源
+        derive = {}
+        for field_name, definition in (spec.get("derive") or {}).items():
+            func, source = definition
+            if func not in DERIVATIONS:
+                raise ValueError(f"查詢 {name}: 不支援的衍生函式 {func}")
+            derive[field_name] = ("derived", func, source)
+        self._derive = derive
+        
+        self.predicates = []
+        for field_name, op, value in spec.get("filter") or []:
+            if op not in OPERATORS:
+                raise ValueError(f"查詢 {name}: 不支援的運算子 {op}")
+            # 以 repr 作為快取鍵，清單等不可雜湊的比較值也能共用篩選結果
+            self.predicates.append(((self.field(field_name), op, repr(value)), value))
+        
+        self.join = None  # (關聯鍵集合的 ID, 本資源的欄位)
+        self.values = self.field(spec["values"]) if "values" in spec else None
+        group = spec.get("group")
+        self.group = self.field(group["by"]) if group else None
+        sort = spec.get("sort")
+        self.sort = (self.field(sort["by"]), sort.get("desc", False), sort.get("default")) if sort else None
+        self.select = {alias: self.field(field_name) for alias, field_name in (spec.get("select") or {}).items()}
+        self.top = spec.get("top")
+    
+    def field(self, name: str) -> Tuple:
+        return self._derive.get(name, ("field", name))
+    
+    def indices(self, scan: _Scan, join_keys: Dict[str, set]) -> List[int]:
+        selections = [scan.where(key, value) for key, value in self.predicates]
+        if self.join is not None:
+            key_id, field = self.join
+            selections.append(scan.joined(field, key_id, join_keys[key_id]))
+        return _intersect(selections) if selections else list(range(len(scan.rows)))
+    
+    def run(self, scan: _Scan, join_keys: Dict[str, set]) -> Any:
+        indices = self.indices(scan, join_keys)
+        if self.values is not None:
+            keys = set()
+            for value in scan.values(self.values, indices):
+                keys.update(_items(value))
+            return keys
+        if self.group is not None:
+            counts = Counter()
+            for value in scan.values(self.group, indices):
+                counts.update(_items(value))
+            return dict(counts.most_common(self.top) if self.top else counts)
+        
+        if self.sort is not None:
+            field, desc, default = self.sort
+            sort_keys = [default if value is None else value for value in scan.values(field, indices)]
+            positions = range(len(indices))
+            if self.top is not None:
+                # 與 sorted(...)[:top] 結果相同（含相同值時的順序），但只保留前 N 筆
+                pick = heapq.nlargest if desc else heapq.nsmallest
+                order = pick(self.top, positions, key=sort_keys.__getitem__)
+            else:
+                order = sorted(positions, key=sort_keys.__getitem__, reverse=desc)
+            indices = [indices[position] for position in order]
+        elif self.top is not None:
+            indices = indices[:self.top]
+        
+        if not self.select:
+            return [scan.rows[i] for i in indices]
+        columns = {alias: scan.values(field, indices) for alias, field in self.select.items()}
+        return [{alias: column[position] for alias, column in columns.items()} for position in range(len(indices))]
+
+
+class QueryPlan:
+    """將查詢依資源分組，並依關聯相依性決定掃描順序"""
+    
+    def __init__(self, queries: Dict[str, Dict[str, Any]]):
+        self.joins = {}  # 關聯子查詢規格的 repr -> 關聯鍵集合的 ID，相同子查詢只建立一次
+        self.queries = {}  # 資源 -> [_Query]
+        self.depends = {}  # 資源 -> 掃描前必須完成的資源
+        self.outputs = []
+        for name, spec in queries.items():
+            unknown = set(spec) - QUERY_KEYS
+            if unknown:
+                raise ValueError(f"查詢 {name}: 不支援的欄位 {', '.join(sorted(unknown))}")
+            self.outputs.append(self._add(name, spec))
+        self.order = self._scan_order()
+    
+    def _add(self, name: str, spec: Dict[str, Any], key_id: str = None) -> _Query:
+        if not spec.get("resource"):
+            raise ValueError(f"查詢 {name}: 缺少 resource")
+        query = _Query(name, spec, key_id)
+        join = spec.get("join")
+        if join:
+            unknown = set(join) - JOIN_KEYS
+            if unknown or not join.get("on") or not join.get("values"):
+                raise ValueError(f"查詢 {name}: 關聯需要 on、resource 與 values")
+            sub_spec = {key: value for key, value in join.items() if key != "on"}
+            key_id = self.joins.get(repr(sub_spec))
+            if key_id is None:
+                key_id = self.joins[repr(sub_spec)] = f"{name}.join"
+                self._add(key_id, sub_spec, key_id)
+            query.join = (key_id, query.field(join["on"]))
+            self.depends.setdefault(spec["resource"], set()).add(join["resource"])
+        self.queries.setdefault(spec["resource"], []).append(query)
+        return query
+    
+    def _scan_order(self) -> List[str]:
+        order, visiting = [], set()
+        
+        def visit(resource: str):
+            if resource in order:
+                return
+            if resource in visiting:
+                raise ValueError(f"查詢的關聯形成循環（{resource}），無法在單次掃描中完成")
+            visiting.add(resource)
+            for dependency in sorted(self.depends.get(resource, ())):
+                visit(dependency)
+            visiting.discard(resource)
+            order.append(resource)
+        
+        for resource in self.queries:
+            visit(resource)
+        return order
+    
+    def execute(self, load: Callable[[str], List[Dict[str, Any]]]) -> Dict[str, Any]:
+        """依相依順序讀取每個資源一次，回傳 {查詢名稱: 結果}"""
+        join_keys, results = {}, {}
+        for resource in self.order:
+            scan = _Scan(load(resource))
+            for query in self.queries[resource]:
+                result = query.run(scan, join_keys)
+                if query.key_id:
+                    join_keys[query.key_id] = result
+                else:
+                    results[query.name] = result
+        return {query.name: results[query.name] for query in self.outputs}
+
+
+def run_queries(queries: Dict[str, Dict[str, Any]], load: Callable[[str], List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """規劃並執行一批查詢；load(resource) 回傳該資源的所有資料"""
+    return QueryPlan(queries).execute(load)
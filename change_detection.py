@@ -0,0 +1,257 @@
+"""
+儲存庫變更偵測
+啟動瀏覽器前先以 GitHub API 取得最新 commit SHA（帶 ETag 的條件式請求），並對分析會造訪的頁面送出條件式請求；
+儲存庫沒有變更時直接沿用以「儲存庫 + SHA」保存的分析結果
+"""
+
+import copy
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+DEFAULT_STORE_PATH = os.environ.get("UI_RESULT_STORE", os.path.join(".cache", "analysis_results.json"))
+GITHUB_API = "https://api.github.com"
+RESULTS_PER_REPO = 5  # 每個儲存庫保留的 SHA 結果數
+REQUEST_TIMEOUT = 10
+
+
+def repo_slug(repo_url: str) -> Optional[str]:
+    """https://github.com/owner/name -> owner/name"""
+    parts = urlparse(repo_url).path.strip("/").split("/")
+    return "/".join(parts[:2]) if len(parts) >= 2 else None
+
+
+def _validators(response) -> Dict[str, str]:
+    return {key: value for key, value in (
+        ("etag", response.headers.get("ETag")),
+        ("last_modified", response.headers.get("Last-Modified")),
+    ) if value}
+
+
+def _content_validators(validators: Dict[str, str]) -> Dict[str, str]:
+    """
+    可用來判斷內容變更的驗證值
+    
+    弱 ETag（W/ 開頭）在 GitHub 的 HTML 頁面會隨每次請求的 token 改變，不代表內容變更，因此不採用
+    """
+    return {key: value for key, value in validators.items() if not (key == "etag" and value.startswith("W/"))}
+
+
+class ResultStore:
+    """以儲存庫與 SHA 保存分析結果，並記錄 API 與頁面的驗證值"""
+    
+    def __init__(self, path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = self._load()
+    
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        data.setdefault("repos", {})
+        data.setdefault("results", {})
+        return data
+    
+    # 批次爬取時多個 worker 共用同一個 ResultStore：所有讀寫都在鎖內進行，
+    # 讀取回傳複本，避免呼叫端修改的內容在另一個 worker 寫檔時被同時走訪
+    
+    def repo(self, repo_url: str) -> Dict[str, Any]:
+        """儲存庫的最新 SHA、API ETag 與頁面驗證值（複本）"""
+        with self._lock:
+            entry = self.data["repos"].get(repo_url) or {"sha": None, "api_etag": None, "pages": {}}
+            return copy.deepcopy(entry)
+    
+    def update_repo(self, repo_url: str, **changes):
+        """更新儲存庫的 SHA 或 API ETag"""
+        with self._lock:
+            entry = self.data["repos"].setdefault(repo_url, {"sha": None, "api_etag": None, "pages": {}})
+            entry.update(changes)
+    
+    def set_page(self, repo_url: str, page_url: str, validators: Dict[str, str]):
+        """記錄頁面目前的驗證值"""
+        with self._lock:
+            entry = self.data["repos"].setdefault(repo_url, {"sha": None, "api_etag": None, "pages": {}})
+            entry["pages"][page_url] = dict(validators)
+    
+    def results(self, repo_url: str, sha: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self.data["results"].get(f"{repo_url}@{sha}")
+            return copy.deepcopy(entry["results"]) if entry else None
+    
+    def put_results(self, repo_url: str, sha: str, results: Dict[str, Any]):
+        """保存結果（複本），每個儲存庫只保留最近的幾個 SHA"""
+        results = copy.deepcopy(results)
+        with self._lock:
+            self.data["results"][f"{repo_url}@{sha}"] = {"results": results, "stored_at": time.time()}
+            keys = sorted(
+                (key for key in self.data["results"] if key.startswith(f"{repo_url}@")),
+                key=lambda key: self.data["results"][key]["stored_at"],
+            )
+            for key in keys[:-RESULTS_PER_REPO]:
+                del self.data["results"][key]
+    
+    def save(self):
+        """寫入檔案（先寫暫存檔再取代，避免中斷時留下損毀的 JSON）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+class ChangeDetector:
+    """判斷儲存庫自上次完整分析後是否有變更"""
+    
+    def __init__(self, store: ResultStore = None, session: requests.Session = None, rate_limiter=None):
+        self.store = store or ResultStore()
+        self.session = session or requests.Session()
+        self.rate_limiter = rate_limiter  # 批次爬取時與瀏覽器共用的每主機請求間隔限制
+        token = os.environ.get("GITHUB_TOKEN")
+        self._api_headers = {"Accept": "application/vnd.github.sha"}
+        if token:
+            self._api_headers["Authorization"] = f"Bearer {token}"
+    
+    def _get(self, url: str, **kwargs):
+        if self.rate_limiter:
+            self.rate_limiter.wait(url)
+        return self.session.get(url, timeout=REQUEST_TIMEOUT, **kwargs)
+    
+    def latest_sha(self, repo_url: str) -> Optional[str]:
+        """
+        取得預設分支的最新 commit SHA，失敗時回傳 None
+        
+        帶上次的 ETag 送出條件式請求，未變更時 GitHub 回傳 304 且不計入 API 速率限制
+        """
+        slug = repo_slug(repo_url)
+        if not slug:
+            return None
+        entry = self.store.repo(repo_url)
+        headers = dict(self._api_headers)
+        if entry["api_etag"]:
+            headers["If-None-Match"] = entry["api_etag"]
+        try:
+            response = self._get(f"{GITHUB_API}/repos/{slug}/commits/HEAD", headers=headers)
+        except requests.RequestException as e:
+            print(f"警告: 無法取得 {slug} 的最新 commit: {e}")
+            return None
+        if response.status_code == 304:
+            return entry["sha"]
+        if response.status_code != 200:
+            print(f"警告: 無法取得 {slug} 的最新 commit（HTTP {response.status_code}）")
+            return None
+        sha = response.text.strip()
+        self.store.update_repo(repo_url, sha=sha, api_etag=response.headers.get("ETag"))
+        return sha
+    
+    def _fetch_validators(self, url: str, previous: Dict[str, str] = None) -> Tuple[Optional[int], Dict[str, str]]:
+        """對頁面送出條件式請求（只讀標頭不下載內容），回傳狀態碼與新的驗證值"""
+        headers = {}
+        if previous:
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
+        try:
+            with self._get(url, headers=headers, stream=True) as response:
+                return response.status_code, _validators(response)
+        except requests.RequestException:
+            return None, {}
+    
+    def pages_changed(self, repo_url: str, page_urls: List[str]) -> bool:
+        """任一頁面回傳 304 以外且內容驗證值不同時視為已變更；沒有可比較的驗證值時交由 SHA 判斷"""
+        pages = self.store.repo(repo_url)["pages"]
+        for url in page_urls:
+            previous = pages.get(url, {})
+            status, current = self._fetch_validators(url, previous)
+            if status == 304:
+                continue
+            if status != 200:
+                return True
+            old, new = _content_validators(previous), _content_validators(current)
+            self.store.set_page(repo_url, url, current)
+            if old and new and old != new:
+                return True
+        return False
+    
+    def check(self, repo_url: str, page_urls: List[str]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """回傳 (最新 SHA, 未變更時保存的結果)；無法判斷或已變更時結果為 None"""
+        sha = self.latest_sha(repo_url)
+        stored = self.store.results(repo_url, sha) if sha else None
+        if stored is not None and self.pages_changed(repo_url, page_urls):
+            stored = None
+        try:
+            self.store.save()
+        except OSError as e:
+            print(f"警告: 無法寫入分析結果快取: {e}")
+        return sha, stored
+    
+    def record(self, repo_url: str, sha: str, results: Dict[str, Any], page_urls: List[str]):
+        """完整分析後保存結果，並記錄各頁面目前的驗證值供下次條件式請求使用"""
+        for url in page_urls:
+            status, validators = self._fetch_validators(url)
+            if status == 200:
+                self.store.set_page(repo_url, url, validators)
+        self.store.put_results(repo_url, sha, results)
+        try:
+            self.store.save()
+        except OSError as e:
+            print(f"警告: 無法寫入分析結果快取: {e}")
+
+
+class TestChangeDetection:
+    """變更偵測測試"""
+    
+    def test_change_detection_reuses_unchanged_results(self, tmp_path):
+        """測試：最新 SHA 與頁面驗證值未變更時沿用保存的結果，SHA 改變時重新分析"""
+        class FakeResponse(SimpleNamespace):
+            def __enter__(self):
+                return self
+            
+            def __exit__(self, *exc_info):
+                return False
+        
+        class FakeSession:
+            """GitHub 以目前 SHA 作為 ETag，條件式請求相符時回傳 304"""
+            
+            def __init__(self):
+                self.sha, self.requests = "a" * 40, []
+            
+            def get(self, url, headers=None, **kwargs):
+                headers = headers or {}
+                self.requests.append((url, headers))
+                etag = f'"{self.sha}"'
+                status = 304 if headers.get("If-None-Match") == etag else 200
+                return FakeResponse(status_code=status, text=self.sha, headers={"ETag": etag})
+        
+        session = FakeSession()
+        store_path = str(tmp_path / "results.json")
+        repo = "https://github.com/hahow/hahow-recruit"
+        pages = [repo, f"{repo}/commits"]
+        waits = []
+        detector = ChangeDetector(ResultStore(store_path), session, rate_limiter=SimpleNamespace(wait=waits.append))
+        
+        sha, stored = detector.check(repo, pages)
+        assert (sha, stored) == ("a" * 40, None)
+        # 變更偵測的請求同樣經過批次爬取共用的每主機請求間隔
+        assert waits == [url for url, _ in session.requests]
+        detector.record(repo, sha, {"last_commit": {"author": "hahow"}}, pages)
+        
+        detector = ChangeDetector(ResultStore(store_path), session)
+        session.requests.clear()
+        assert detector.check(repo, pages) == ("a" * 40, {"last_commit": {"author": "hahow"}})
+        assert session.requests[0][1]["If-None-Match"] == f'"{"a" * 40}"'
+        
+        session.sha = "b" * 40
+        assert detector.check(repo, pages) == ("b" * 40, None)
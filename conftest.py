@@ -0,0 +1,9 @@
+"""pytest 共用設定：載入專案內建的外掛"""
+
+pytest_plugins = [
+    "ui_tracing",
+    "screenshot_pipeline",
+    "duration_history",
+    "analysis_report",
+    "perf_profiler",
+]
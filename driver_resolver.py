@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+ChromeDriver 延遲解析與快取
+第一次需要瀏覽器時才解析 ChromeDriver，結果依 Chrome 版本快取；之後的執行只比對檔案狀態，
+不需要啟動 Chrome 或連線檢查版本
+"""
+
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+from typing import Dict, Any, List, Optional
+
+CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "hahow-qe",
+    "chromedriver.json",
+)
+
+CHROME_PATHS = {
+    'darwin': ['/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'],
+    'linux': ['/usr/bin/google-chrome', '/usr/bin/google-chrome-stable', '/usr/bin/chromium-browser'],
+    'windows': [
+        r'C:\Program Files\Google\Chrome\Application\chrome.exe',
+        r'C:\Program Files (x86)\Google\Chrome\Application\chrome.exe'
+    ]
+}
+
+CHROME_COMMANDS = ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome']
+
+_resolved = {}
+
+
+def find_chrome_binary() -> Optional[str]:
+    """尋找 Chrome 執行檔，優先使用 CHROME_BIN 環境變數"""
+    chrome_bin = os.environ.get("CHROME_BIN")
+    if chrome_bin:
+        found = chrome_bin if os.path.exists(chrome_bin) else shutil.which(chrome_bin)
+        if found:
+            return found
+    
+    for path in CHROME_PATHS.get(platform.system().lower(), []):
+        if os.path.exists(path):
+            return path
+    
+    for command in CHROME_COMMANDS:
+        found = shutil.which(command)
+        if found:
+            return found
+    return None
+
+
+def file_signature(path: Optional[str]) -> Optional[List[int]]:
+    """以檔案大小與修改時間作為便宜的變更檢查"""
+    if not path:
+        return None
+    try:
+        stat = os.stat(os.path.realpath(path))
+    except OSError:
+        return None
+    return [stat.st_size, int(stat.st_mtime)]
+
+
+def get_chrome_version(chrome_binary: Optional[str]) -> Optional[str]:
+    """取得 Chrome 版本號"""
+    if platform.system().lower() == 'windows' or not chrome_binary:
+        try:
+            import chromedriver_autoinstaller
+            return chromedriver_autoinstaller.get_chrome_version()
+        except Exception:
+            return None
+    
+    try:
+        output = subprocess.run([chrome_binary, "--version"], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r'(\d+\.\d+\.\d+\.\d+)', output)
+    return match.group(1) if match else None
+
+
+def load_cache() -> Dict[str, Any]:
+    """讀取快取，不存在或損毀時回傳空字典"""
+    try:
+        with open(CACHE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache: Dict[str, Any]):
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(CACHE_PATH, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+    except OSError as e:
+        print(f"警告: 無法寫入 ChromeDriver 快取: {e}")
+
+
+def _install_chromedriver() -> Optional[str]:
+    """下載與 Chrome 版本相符的 ChromeDriver（如失敗則改用 Selenium Manager）"""
+    try:
+        import chromedriver_autoinstaller
+    except ImportError:
+        print("警告: chromedriver_autoinstaller 未安裝，將使用 Selenium 內建管理器")
+        return None
+    
+    try:
+        # 在某些環境（如公司代理或憑證問題）可能下載失敗
+        return chromedriver_autoinstaller.install()
+    except Exception as e:
+        print(f"警告: chromedriver_autoinstaller 失敗，改用 Selenium 內建管理器。原因: {e}")
+        return None
+
+
+def resolve_chromedriver(force: bool = False) -> Optional[str]:
+    """
+    解析 ChromeDriver 路徑，回傳 None 表示交由 Selenium Manager 處理
+    
+    快取依 Chrome 版本記錄驅動程式路徑；Chrome 與驅動程式檔案狀態都沒變時直接沿用，
+    只有 Chrome 更新或驅動程式遺失時才重新下載
+    """
+    if not force and "path" in _resolved:
+        return _resolved["path"]
+    
+    chrome_binary = find_chrome_binary()
+    chrome_signature = file_signature(chrome_binary)
+    cache = {} if force else load_cache()
+    driver_path = cache.get("driver_path")
+    driver_valid = driver_path and file_signature(driver_path) == cache.get("driver_signature")
+    
+    if driver_valid and cache.get("chrome_binary") == chrome_binary and cache.get("chrome_signature") == chrome_signature:
+        _resolved["path"] = driver_path
+        return driver_path
+    
+    chrome_version = get_chrome_version(chrome_binary)
+    if not (driver_valid and chrome_version and cache.get("chrome_version") == chrome_version):
+        driver_path = _install_chromedriver()
+    
+    if driver_path:
+        _save_cache({
+            "chrome_binary": chrome_binary,
+            "chrome_signature": chrome_signature,
+            "chrome_version": chrome_version,
+            "driver_path": driver_path,
+            "driver_signature": file_signature(driver_path),
+        })
+    _resolved["path"] = driver_path
+    return driver_path
+
+
+def main():
+    """主要執行函數"""
+    parser = argparse.ArgumentParser(description="解析並快取 ChromeDriver 路徑")
+    parser.add_argument("--force", action="store_true", help="忽略快取重新解析")
+    args = parser.parse_args()
+    
+    driver_path = resolve_chromedriver(force=args.force)
+    print(driver_path or "使用 Selenium 內建管理器")
+
+
+if __name__ == "__main__":
+    main()
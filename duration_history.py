@@ -0,0 +1,261 @@
+"""
+測試耗時歷史與排程
+跨執行記錄每個測試的耗時與結果，依歷史資料將測試由長到短排序、切出負載平衡的分片，
+並可讓最近失敗的測試優先執行
+"""
+
+import json
+import os
+import statistics
+import time
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional
+
+import pytest
+
+DEFAULT_HISTORY_PATH = os.environ.get("TEST_DURATION_HISTORY", os.path.join(".cache", "test_durations.json"))
+DEFAULT_DURATION = 1.0  # 沒有任何歷史資料時的預估秒數
+SMOOTHING = 0.5  # 新耗時在移動平均中的權重
+OUTCOME_HISTORY = 10  # 每個測試保留的最近結果數
+
+_active = {"results": None}
+
+
+class DurationHistory:
+    """每個測試的平滑耗時與最近結果"""
+    
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH):
+        self.path = path
+        self.tests = self._load()
+    
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f).get("tests", {})
+        except (OSError, ValueError, AttributeError):
+            return {}
+    
+    def duration(self, nodeid: str) -> Optional[float]:
+        entry = self.tests.get(nodeid)
+        return entry["duration"] if entry else None
+    
+    def default_duration(self) -> float:
+        """未知測試的預估耗時：已知測試的中位數"""
+        durations = [entry["duration"] for entry in self.tests.values()]
+        return statistics.median(durations) if durations else DEFAULT_DURATION
+    
+    def recently_failed(self, nodeid: str, window: int) -> bool:
+        """最近 window 次執行中是否失敗過"""
+        outcomes = self.tests.get(nodeid, {}).get("outcomes", [])
+        return "failed" in outcomes[-window:]
+    
+    def record(self, nodeid: str, duration: float, outcome: str):
+        """以指數移動平均更新耗時，並保留最近的結果"""
+        entry = self.tests.get(nodeid)
+        if entry is None:
+            entry = self.tests[nodeid] = {"duration": duration, "runs": 0, "outcomes": []}
+        else:
+            entry["duration"] = SMOOTHING * duration + (1 - SMOOTHING) * entry["duration"]
+        entry["last_duration"] = duration
+        entry["runs"] += 1
+        entry["outcomes"] = (entry["outcomes"] + [outcome])[-OUTCOME_HISTORY:]
+        entry["last_run"] = time.time()
+    
+    def save(self, updated: List[str] = None):
+        """
+        寫入檔案
+        
+        只合併本次執行過的測試到檔案中的最新內容，分片平行執行時各行程不會互相覆蓋
+        """
+        tests = self._load()
+        for nodeid in (updated if updated is not None else self.tests):
+            tests[nodeid] = self.tests[nodeid]
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"tests": tests}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def _group_key(item) -> str:
+    """同一個測試類別的測試視為一組，排序時保持相鄰以重用類別範圍的 fixture"""
+    return item.nodeid.rsplit("::", 1)[0] if getattr(item, "cls", None) else item.nodeid
+
+
+def order_items(items: List, estimates: Dict[str, float], first: Dict[str, bool] = None) -> List:
+    """
+    依預估耗時由長到短排序
+    
+    以組為單位排序（組內同樣由長到短），first 標記為 True 的測試與其所屬組排在最前面，
+    耗時相同時維持原本的收集順序
+    """
+    first = first or {}
+    position = {item.nodeid: index for index, item in enumerate(items)}
+    groups = {}
+    for item in items:
+        groups.setdefault(_group_key(item), []).append(item)
+    
+    def item_key(item):
+        return (not first.get(item.nodeid, False), -estimates[item.nodeid], position[item.nodeid])
+    
+    ordered_groups = sorted(
+        groups.values(),
+        key=lambda group: (
+            not any(first.get(item.nodeid, False) for item in group),
+            -sum(estimates[item.nodeid] for item in group),
+            position[group[0].nodeid],
+        ),
+    )
+    return [item for group in ordered_groups for item in sorted(group, key=item_key)]
+
+
+def balance_shards(items: List, estimates: Dict[str, float], num_shards: int) -> List[List]:
+    """
+    最長處理時間優先（LPT）分配：以組為單位由長到短依序放進目前總耗時最少的分片
+    
+    同一個測試類別的測試放在同一個分片，類別範圍的 fixture 只需在一個分片中建立；
+    結果只取決於測試 ID 與歷史資料，同時啟動的各分片會算出相同的分配
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault(_group_key(item), []).append(item)
+    
+    shards = [[] for _ in range(num_shards)]
+    loads = [0.0] * num_shards
+    for key, group in sorted(groups.items(),
+                             key=lambda entry: (-sum(estimates[item.nodeid] for item in entry[1]), entry[0])):
+        index = min(range(num_shards), key=lambda i: (loads[i], i))
+        shards[index].extend(group)
+        loads[index] += sum(estimates[item.nodeid] for item in group)
+    return shards
+
+
+class TestDurationHistory:
+    """耗時歷史與排程測試"""
+    
+    def test_duration_history_balances_shards(self, tmp_path):
+        """測試：依耗時歷史切出平衡的分片，同一類別的測試分在同一個分片並保持相鄰"""
+        history = DurationHistory(str(tmp_path / "durations.json"))
+        durations = {"a.py::TestUI::test_1": 8, "a.py::TestUI::test_2": 1, "a.py::test_3": 5,
+                     "a.py::test_4": 4, "a.py::test_5": 3}
+        for nodeid, duration in durations.items():
+            history.record(nodeid, duration, "failed" if nodeid == "a.py::test_5" else "passed")
+        history.save()
+        history = DurationHistory(str(tmp_path / "durations.json"))
+        
+        items = [SimpleNamespace(nodeid=nodeid, cls=object if "TestUI" in nodeid else None) for nodeid in durations]
+        estimates = {item.nodeid: history.duration(item.nodeid) for item in items}
+        shards = balance_shards(items, estimates, 2)
+        assert [[item.nodeid for item in shard] for shard in shards] == [
+            ["a.py::TestUI::test_1", "a.py::TestUI::test_2", "a.py::test_5"], ["a.py::test_3", "a.py::test_4"]
+        ]
+        assert [sum(estimates[item.nodeid] for item in shard) for shard in shards] == [12, 9]
+        
+        first = {item.nodeid: history.recently_failed(item.nodeid, 3) for item in items}
+        assert [item.nodeid for item in order_items(items, estimates, first)] == [
+            "a.py::test_5", "a.py::TestUI::test_1", "a.py::TestUI::test_2", "a.py::test_3", "a.py::test_4"
+        ]
+
+
+# --- pytest 外掛 ---
+
+def pytest_addoption(parser):
+    group = parser.getgroup("duration_history", "測試耗時歷史與排程")
+    group.addoption("--duration-history", default=DEFAULT_HISTORY_PATH,
+                    help=f"耗時歷史檔案（預設 {DEFAULT_HISTORY_PATH}）")
+    group.addoption("--no-duration-history", action="store_true", default=False,
+                    help="不記錄本次執行的耗時")
+    group.addoption("--longest-first", action="store_true", default=False,
+                    help="依歷史耗時由長到短執行測試")
+    group.addoption("--recent-failures-first", action="store_true", default=False,
+                    help="最近失敗過的測試優先執行")
+    group.addoption("--recent-failure-window", type=int, default=3,
+                    help="判斷最近失敗時檢查的執行次數（預設 3）")
+    group.addoption("--num-shards", type=int, default=1,
+                    help="將測試依歷史耗時切成幾個負載平衡的分片")
+    group.addoption("--shard-id", type=int, default=0,
+                    help="本行程執行的分片編號（從 0 開始）")
+
+
+def pytest_configure(config):
+    num_shards, shard_id = config.getoption("--num-shards"), config.getoption("--shard-id")
+    if num_shards < 1 or not 0 <= shard_id < num_shards:
+        raise pytest.UsageError(f"--shard-id 必須介於 0 與 --num-shards - 1 之間（目前 {shard_id}/{num_shards}）")
+    config._duration_history = DurationHistory(config.getoption("--duration-history"))
+    _active["results"] = {}
+    config._shard_estimate = None
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(session, config, items):
+    history = config._duration_history
+    default = history.default_duration()
+    estimates = {}
+    for item in items:
+        duration = history.duration(item.nodeid)
+        estimates[item.nodeid] = default if duration is None else duration
+    
+    num_shards = config.getoption("--num-shards")
+    if num_shards > 1:
+        shards = balance_shards(items, estimates, num_shards)
+        selected = shards[config.getoption("--shard-id")]
+        selected_ids = {item.nodeid for item in selected}
+        deselected = [item for item in items if item.nodeid not in selected_ids]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+        # 保留原本的收集順序，之後再依選項重新排序
+        items[:] = [item for item in items if item.nodeid in selected_ids]
+        config._shard_estimate = (
+            sum(estimates[item.nodeid] for item in selected),
+            [sum(estimates[item.nodeid] for item in shard) for shard in shards],
+        )
+    
+    first = {}
+    if config.getoption("--recent-failures-first"):
+        window = config.getoption("--recent-failure-window")
+        first = {item.nodeid: history.recently_failed(item.nodeid, window) for item in items}
+    if config.getoption("--longest-first") or any(first.values()):
+        items[:] = order_items(items, estimates if config.getoption("--longest-first")
+                               else {item.nodeid: 0.0 for item in items}, first)
+
+
+def pytest_report_collectionfinish(config, start_path, items):
+    if config._shard_estimate is None:
+        return None
+    estimate, loads = config._shard_estimate
+    return (f"分片 {config.getoption('--shard-id') + 1}/{config.getoption('--num-shards')}: "
+            f"{len(items)} 個測試，預估 {estimate:.1f} 秒（各分片 {', '.join(f'{load:.1f}' for load in loads)} 秒）")
+
+
+def pytest_runtest_logreport(report):
+    # 累加 setup/call/teardown 各階段耗時；xdist 的主控行程也會收到各 worker 的報告
+    results = _active["results"]
+    if results is None:
+        return
+    result = results.setdefault(report.nodeid, {"duration": 0.0, "outcome": "passed"})
+    result["duration"] += report.duration
+    if report.failed:
+        result["outcome"] = "failed"
+    elif report.skipped and result["outcome"] == "passed":
+        result["outcome"] = "skipped"
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    # xdist worker 不寫檔，由主控行程統一記錄
+    if config.getoption("--no-duration-history") or hasattr(config, "workerinput"):
+        return
+    
+    results, _active["results"] = _active["results"], None
+    if not results:
+        return
+    history = config._duration_history
+    for nodeid, result in results.items():
+        history.record(nodeid, result["duration"], result["outcome"])
+    try:
+        history.save(list(results))
+    except OSError as e:
+        print(f"警告: 無法寫入耗時歷史: {e}")
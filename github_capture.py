@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+GitHub 頁面錄製與重播
+錄製模式保存 HahowRecruitAnalyzer 造訪頁面渲染後的 DOM，重播模式由本機伺服器提供這些頁面，
+讓 UI 測試不需連線到 github.com 也能執行
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.request import urlopen
+
+import pytest
+
+CAPTURE_MODES = ("off", "record", "replay")
+DEFAULT_CAPTURE_MODE = os.environ.get("UI_CAPTURE_MODE", "off")
+DEFAULT_CAPTURE_DIR = os.environ.get("UI_CAPTURE_DIR", os.path.join("captures", "github"))
+RECORDED_HOST = "github.com"
+
+# 保存渲染後的 DOM：移除腳本與外部資源，重播時頁面不會再發出請求或被 JS 改寫
+SNAPSHOT_SCRIPT = """
+const root = document.documentElement.cloneNode(true);
+root.querySelectorAll(
+    "script, iframe, link[rel='stylesheet'], link[rel='preload'], link[rel='modulepreload'], link[rel='prefetch']"
+).forEach(el => el.remove());
+return '<!DOCTYPE html>' + root.outerHTML;
+"""
+
+NOT_FOUND_PAGE = "<!DOCTYPE html><html><head><title>Page not found · GitHub</title></head><body>404</body></html>"
+
+
+def capture_key(url: str) -> Optional[str]:
+    """將 github.com 網址轉為錄製索引鍵（路徑加查詢字串），其他網域回傳 None"""
+    parts = urlsplit(url)
+    if parts.hostname != RECORDED_HOST:
+        return None
+    return _path_key(parts.path, parts.query)
+
+
+def _path_key(path: str, query: str = "") -> str:
+    path = path.rstrip("/") or "/"
+    return f"{path}?{query}" if query else path
+
+
+class CaptureStore:
+    """錄製頁面的儲存區：manifest.json 加上 pages/ 下的 HTML 檔"""
+    
+    def __init__(self, directory: str = DEFAULT_CAPTURE_DIR):
+        self.directory = directory
+        self.pages_dir = os.path.join(directory, "pages")
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        self.manifest = self._load_manifest()
+    
+    def _load_manifest(self) -> Dict[str, Any]:
+        """讀取 manifest，不存在時回傳空的錄製"""
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"recorded_at": None, "pages": {}}
+    
+    def __len__(self) -> int:
+        return len(self.manifest["pages"])
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """依索引鍵取得錄製頁面（含 HTML 內容）"""
+        entry = self.manifest["pages"].get(key)
+        if not entry:
+            return None
+        
+        try:
+            with open(os.path.join(self.pages_dir, entry["file"]), encoding="utf-8") as f:
+                return dict(entry, html=f.read())
+        except OSError:
+            return None
+    
+    def put(self, url: str, html: str, title: str) -> bool:
+        """保存頁面，非 github.com 網址不錄製"""
+        key = capture_key(url)
+        if key is None:
+            return False
+        
+        filename = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16] + ".html"
+        os.makedirs(self.pages_dir, exist_ok=True)
+        with open(os.path.join(self.pages_dir, filename), "w", encoding="utf-8") as f:
+            f.write(html)
+        
+        self.manifest["pages"][key] = {
+            "url": url,
+            "title": title,
+            "file": filename,
+            "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        return True
+    
+    def save(self):
+        """寫入 manifest"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.manifest["recorded_at"] = datetime.now().isoformat(timespec="seconds")
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+    
+    def age_days(self) -> Optional[float]:
+        """距離上次錄製的天數"""
+        if not self.manifest.get("recorded_at"):
+            return None
+        recorded_at = datetime.fromisoformat(self.manifest["recorded_at"])
+        return (datetime.now() - recorded_at).total_seconds() / 86400
+
+
+class ReplayServer:
+    """在本機以 HTTP 提供錄製頁面，路徑與 github.com 相同"""
+    
+    def __init__(self, store: CaptureStore, port: int = 0):
+        self.store = store
+        self.port = port
+        self._server = None
+        self._thread = None
+    
+    @property
+    def origin(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+    
+    def start(self) -> "ReplayServer":
+        """在背景執行緒啟動伺服器"""
+        store = self.store
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                page = store.get(_path_key(parts.path, parts.query))
+                if page is None:
+                    self.send_response(404)
+                    body = NOT_FOUND_PAGE.encode("utf-8")
+                else:
+                    self.send_response(200)
+                    body = page["html"].encode("utf-8")
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self
+    
+    def rewrite(self, url: str) -> str:
+        """將 github.com 網址改寫為本機伺服器網址"""
+        parts = urlsplit(url)
+        if parts.hostname != RECORDED_HOST:
+            return url
+        return self.origin + parts.path + (f"?{parts.query}" if parts.query else "")
+    
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def record_analyzer_pages(capture_dir: str, base_url: str, backend: str = None):
+    """以錄製模式執行所有分析步驟，保存造訪過的頁面"""
+    from ui_automation import HahowRecruitAnalyzer
+    
+    analyzer = HahowRecruitAnalyzer(base_url, backend=backend, capture_mode="record", capture_dir=capture_dir)
+    try:
+        analyzer.get_contributors_info()
+        analyzer.check_frontend_wireframe_image()
+        analyzer.get_last_commit_author()
+    finally:
+        analyzer.close()
+
+
+def refresh_capture(capture_dir: str, base_url: str, backend: str = None) -> CaptureStore:
+    """重新錄製到暫存目錄，成功後才取代舊的錄製"""
+    staging_dir = capture_dir.rstrip(os.sep) + ".tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    record_analyzer_pages(staging_dir, base_url, backend)
+    
+    store = CaptureStore(staging_dir)
+    if not len(store):
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise RuntimeError("重新錄製沒有保存任何頁面，保留原本的錄製")
+    
+    shutil.rmtree(capture_dir, ignore_errors=True)
+    os.replace(staging_dir, capture_dir)
+    return CaptureStore(capture_dir)
+
+
+def print_status(store: CaptureStore):
+    """顯示錄製內容與新舊程度"""
+    age = store.age_days()
+    if age is None:
+        print(f"{store.directory} 尚未錄製，請執行: python3 github_capture.py refresh")
+        return
+    
+    print(f"錄製目錄: {store.directory}")
+    print(f"錄製時間: {store.manifest['recorded_at']}（{age:.1f} 天前）")
+    print(f"頁面數量: {len(store)}")
+    for key, entry in sorted(store.manifest["pages"].items()):
+        print(f"  {key} - {entry['title']}")
+
+
+class TestGitHubCapture:
+    """頁面錄製與重播測試"""
+    
+    def test_replay_server_serves_recorded_pages(self, tmp_path):
+        """測試：錄製的頁面可由本機重播伺服器提供"""
+        store = CaptureStore(str(tmp_path))
+        store.put("https://github.com/hahow/hahow-recruit/", "<title>hahow-recruit</title>", "hahow-recruit")
+        assert not store.put("https://example.com/", "<title>x</title>", "x")
+        store.save()
+        
+        server = ReplayServer(CaptureStore(str(tmp_path))).start()
+        try:
+            replay_url = server.rewrite("https://github.com/hahow/hahow-recruit")
+            assert replay_url.startswith("http://127.0.0.1:")
+            with urlopen(replay_url, timeout=5) as response:
+                assert "hahow-recruit" in response.read().decode("utf-8")
+            with pytest.raises(HTTPError) as error:
+                urlopen(server.origin + "/hahow/missing", timeout=5)
+            assert error.value.code == 404
+        finally:
+            server.stop()
+
+
+def main():
+    """主要執行函數"""
+    parser = argparse.ArgumentParser(description="GitHub 頁面錄製與重播")
+    parser.add_argument("command", choices=["record", "refresh", "status", "serve"])
+    parser.add_argument("--dir", default=DEFAULT_CAPTURE_DIR, help="錄製目錄")
+    parser.add_argument("--base-url", default="https://github.com/hahow/hahow-recruit", help="分析的專案網址")
+    parser.add_argument("--backend", default=None, help="瀏覽器後端（selenium / playwright）")
+    parser.add_argument("--port", type=int, default=8765, help="serve 使用的埠號")
+    args = parser.parse_args()
+    
+    if args.command == "record":
+        record_analyzer_pages(args.dir, args.base_url, args.backend)
+        print_status(CaptureStore(args.dir))
+    elif args.command == "refresh":
+        try:
+            print_status(refresh_capture(args.dir, args.base_url, args.backend))
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+    elif args.command == "status":
+        print_status(CaptureStore(args.dir))
+    else:
+        server = ReplayServer(CaptureStore(args.dir), port=args.port).start()
+        print(f"重播伺服器: {server.origin}（Ctrl+C 結束）")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+測試效能剖析外掛
+加上 --profile 時，每個測試（含 setup/teardown）在 CPU 剖析器與 tracemalloc 下執行，
+輸出可繪製火焰圖的 collapsed stacks、記憶體配置熱點，並在 HTML 報告中附上連結
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict
+
+import pytest
+
+PROFILE_DIR = os.path.join("reports", "profiles")
+PROFILE_MODES = ("sampling", "cprofile")
+TRACEMALLOC_FRAMES = 1  # 配置熱點只依配置行彙總，一層堆疊即可
+
+# 取樣堆疊從 pytest 執行單一測試的函式開始，省略上層固定的 pytest 啟動堆疊
+ROOT_FUNCTION = "runtestprotocol"
+
+# 配置熱點排除剖析工具本身與匯入機制
+_ALLOCATION_FILTERS = [
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class StackSampler:
+    """定時取樣指定執行緒的呼叫堆疊（wall-clock，等待網路或瀏覽器的時間也會被記錄）"""
+    
+    def __init__(self, thread_id: int = None, interval: float = 0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            if frame.f_code.co_name == ROOT_FUNCTION:
+                break
+            frame = frame.f_back
+        if labels:
+            self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+    
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+    
+    def collapsed(self) -> str:
+        """Brendan Gregg 的 collapsed stacks 格式（flamegraph.pl、speedscope、inferno 皆可讀取）"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _cprofile_collapsed(profiler: cProfile.Profile) -> str:
+    """將 cProfile 的呼叫關係轉成兩層的 collapsed stacks（呼叫者;函式 與自身耗時，單位微秒）"""
+    stats = pstats.Stats(profiler)
+    lines = []
+    for (filename, lineno, name), (_, _, self_time, _, callers) in stats.stats.items():
+        label = f"{name} ({os.path.basename(filename)}:{lineno})".replace(";", ":")
+        total_calls = sum(caller[0] for caller in callers.values()) or 1
+        if not callers:
+            lines.append((label, self_time))
+        for (caller_file, caller_line, caller_name), caller_stats in callers.items():
+            caller_label = f"{caller_name} ({os.path.basename(caller_file)}:{caller_line})".replace(";", ":")
+            lines.append((f"{caller_label};{label}", self_time * caller_stats[0] / total_calls))
+    return "".join(f"{stack} {round(seconds * 1_000_000)}\n"
+                   for stack, seconds in sorted(lines, key=lambda line: -line[1]) if seconds > 0)
+
+
+class TestProfile:
+    """單一測試的 CPU 與記憶體剖析"""
+    
+    __test__ = False  # 避免 pytest 把此類別當成測試收集
+    
+    def __init__(self, name: str, mode: str = "sampling", interval: float = 0.005):
+        self.name = name
+        self.mode = mode
+        self.interval = interval
+        self.sampler = None
+        self.profiler = None
+        self.started_tracemalloc = False
+        self.start_snapshot = None
+        self.peak_snapshot = None
+        self.peak_allocations = []
+        self.allocations = []
+        self._peak_snapshot_bytes = 0
+        self._watch_stop = threading.Event()
+        self._watcher = None
+        self._started = None
+        self.duration = 0.0
+        self.peak_bytes = 0
+    
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self.started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self.start_snapshot = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+        self._peak_snapshot_bytes = tracemalloc.get_traced_memory()[0]
+        self._watcher = threading.Thread(target=self._watch_peak, name="tracemalloc-peak", daemon=True)
+        self._watcher.start()
+        
+        self._started = time.perf_counter()
+        if self.mode == "cprofile":
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        else:
+            self.sampler = StackSampler(interval=self.interval).start()
+    
+    def _watch_peak(self):
+        """記憶體用量明顯超過上次快照時重新快照，測試結束後仍可看到峰值當下的配置位置"""
+        while not self._watch_stop.wait(0.01):
+            current = tracemalloc.get_traced_memory()[0]
+            if current > self._peak_snapshot_bytes * 1.25 + 256 * 1024:
+                self.peak_snapshot = tracemalloc.take_snapshot()
+                self._peak_snapshot_bytes = current
+    
+    def stop(self):
+        if self.profiler:
+            self.profiler.disable()
+        if self.sampler:
+            self.sampler.stop()
+        self.duration = time.perf_counter() - self._started
+        self._watch_stop.set()
+        self._watcher.join()
+        
+        self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        end_snapshot = tracemalloc.take_snapshot().filter_traces(_ALLOCATION_FILTERS)
+        self.allocations = end_snapshot.compare_to(self.start_snapshot, "lineno")
+        if self.peak_snapshot is not None:
+            self.peak_allocations = self.peak_snapshot.filter_traces(_ALLOCATION_FILTERS).compare_to(
+                self.start_snapshot, "lineno"
+            )
+            self.peak_snapshot = None
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+        self.start_snapshot = None
+    
+    def allocation_report(self, top: int) -> str:
+        """峰值當下與測試結束時，相較測試開始增加最多記憶體的配置位置"""
+        lines = [f"測試: {self.name}", f"tracemalloc 峰值: {self.peak_bytes / 1024:.1f} KB"]
+        sections = [("峰值當下", self.peak_allocations), ("測試結束時（未釋放）", self.allocations)]
+        for title, allocations in sections:
+            if not allocations:
+                continue
+            lines.append(f"\n{title}前 {top} 個配置位置:")
+            for stat in sorted(allocations, key=lambda stat: -stat.size_diff)[:top]:
+                frame = stat.traceback[0]
+                lines.append(f"{stat.size_diff / 1024:+10.1f} KB {stat.count_diff:+7d} 次  "
+                             f"{frame.filename}:{frame.lineno}")
+        return "\n".join(lines) + "\n"
+    
+    def cpu_report(self, top: int) -> str:
+        """耗時最多的函式"""
+        if self.profiler:
+            output = io.StringIO()
+            pstats.Stats(self.profiler, stream=output).sort_stats("cumulative").print_stats(top)
+            return output.getvalue()
+        
+        leaf_counts = Counter()
+        for stack, count in self.sampler.stacks.items():
+            leaf_counts[stack.rsplit(";", 1)[-1]] += count
+        lines = [f"測試: {self.name}", f"取樣 {self.sampler.samples} 次，間隔 {self.interval * 1000:.1f} ms",
+                 f"前 {top} 個最常出現在堆疊頂端的函式:"]
+        for label, count in leaf_counts.most_common(top):
+            lines.append(f"{count / max(1, self.sampler.samples):7.1%}  {label}")
+        return "\n".join(lines) + "\n"
+    
+    def write(self, directory: str, top: int) -> Dict[str, str]:
+        """寫出 collapsed stacks、CPU 與記憶體報告，回傳各檔案路徑"""
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, re.sub(r'[^\w.-]+', '_', self.name).strip('_'))
+        collapsed = self.sampler.collapsed() if self.sampler else _cprofile_collapsed(self.profiler)
+        outputs = {
+            "collapsed": (f"{base}.collapsed", collapsed),
+            "cpu": (f"{base}.cpu.txt", self.cpu_report(top)),
+            "memory": (f"{base}.alloc.txt", self.allocation_report(top)),
+        }
+        for path, content in outputs.values():
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+        if self.profiler:
+            self.profiler.dump_stats(f"{base}.prof")
+        return {key: path for key, (path, _) in outputs.items()}
+
+
+class TestPerfProfiler:
+    """剖析工具測試"""
+    
+    def test_stack_sampler_collapsed_stacks(self):
+        """測試：取樣剖析器以 collapsed stacks 格式記錄忙碌中的函式"""
+        def busy_loop():
+            deadline = time.perf_counter() + 0.2
+            while time.perf_counter() < deadline:
+                pass
+        
+        sampler = StackSampler(interval=0.002).start()
+        busy_loop()
+        sampler.stop()
+        
+        assert sampler.samples > 0
+        lines = sampler.collapsed().splitlines()
+        assert any("busy_loop (perf_profiler.py:" in line.rsplit(" ", 1)[0].split(";")[-1] for line in lines)
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+# --- pytest 外掛 ---
+
+def pytest_addoption(parser):
+    group = parser.getgroup("perf_profiler", "測試效能剖析")
+    group.addoption("--profile", action="store_true", default=False, help="剖析每個測試")
+    group.addoption("--profile-mode", default="sampling", choices=PROFILE_MODES,
+                    help="剖析方式: sampling（預設，取樣堆疊）或 cprofile（決定性剖析）")
+    group.addoption("--profile-dir", default=PROFILE_DIR, help=f"剖析結果目錄（預設 {PROFILE_DIR}）")
+    group.addoption("--profile-top", type=int, default=20, help="報告列出的函式與配置位置數量")
+    group.addoption("--profile-interval", type=float, default=5.0, help="取樣間隔（毫秒）")
+    group.addoption("--benchmarks", action="store_true", default=False,
+                    help="執行標記 benchmark 的效能量測（預設不執行）")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: 只輸出耗時的效能量測，加上 --benchmarks 才執行")
+    config._profile_results = []
+
+
+def pytest_collection_modifyitems(config, items):
+    # 效能量測受執行環境影響，不作為一般測試的通過條件
+    if config.getoption("--benchmarks"):
+        return
+    deselected = [item for item in items if item.get_closest_marker("benchmark") is not None]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = [item for item in items if item.get_closest_marker("benchmark") is None]
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    if item.config.getoption("--profile"):
+        item._profile = TestProfile(item.nodeid, item.config.getoption("--profile-mode"),
+                                    item.config.getoption("--profile-interval") / 1000)
+        item._profile.start()
+    yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    yield
+    profile = getattr(item, "_profile", None)
+    if profile is None:
+        return
+    
+    profile.stop()
+    item._profile = None
+    try:
+        item._profile_outputs = profile.write(item.config.getoption("--profile-dir"),
+                                              item.config.getoption("--profile-top"))
+    except OSError as e:
+        print(f"警告: 無法寫入 {item.nodeid} 的剖析結果: {e}")
+        return
+    item.config._profile_results.append((item.nodeid, profile.duration, profile.peak_bytes, item._profile_outputs))
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    outputs = getattr(item, "_profile_outputs", None)
+    if call.when != "teardown" or not outputs:
+        return
+    
+    report = outcome.get_result()
+    report.sections.append(("效能剖析", "\n".join(outputs.values())))
+    try:
+        import pytest_html
+    except ImportError:
+        return
+    report_dir = os.path.dirname(os.path.abspath(item.config.getoption("htmlpath") or "reports/report.html"))
+    labels = {"collapsed": "火焰圖 stacks", "cpu": "CPU 熱點", "memory": "記憶體配置"}
+    report.extras = getattr(report, "extras", []) + [
+        pytest_html.extras.url(os.path.relpath(os.path.abspath(path), report_dir), name=labels[key])
+        for key, path in outputs.items()
+    ]
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    results = getattr(config, "_profile_results", [])
+    if not results:
+        return
+    
+    terminalreporter.section("效能剖析")
+    for nodeid, duration, peak_bytes, outputs in sorted(results, key=lambda result: -result[1]):
+        terminalreporter.write_line(f"{nodeid}: {duration:.2f} 秒，記憶體峰值 {peak_bytes / 1024:.0f} KB "
+                                    f"-> {outputs['collapsed']}")
@@ -0,0 +1,126 @@
+"""
+API 回應解碼
+明確協商 gzip / brotli 壓縮，直接從回應的位元組解析 JSON（安裝 orjson 時使用 orjson）；
+記憶體有限時可改為邊下載邊逐筆解析大型陣列（需安裝 ijson 的 C 後端）
+"""
+
+import itertools
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # 未安裝 orjson 時使用標準函式庫（json.loads 同樣可直接接受位元組）
+
+try:
+    import ijson
+    from ijson.common import JSONError as IncrementalJSONError
+    # 純 Python 後端比整份解析慢一個數量級，只使用 C 後端
+    ijson = ijson.get_backend("yajl2_c")
+except ImportError:
+    ijson = None  # 未安裝 ijson（或沒有 C 後端）時一律整份解析
+    IncrementalJSONError = ValueError
+
+# 回應內容不是有效 JSON（例如被截斷）時可能拋出的例外；json 與 orjson 的解析錯誤都是 ValueError
+DECODE_ERRORS = (ValueError, IncrementalJSONError)
+
+try:
+    import brotli  # noqa: F401  urllib3 以 brotli 或 brotlicffi 解壓縮 br
+    HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAS_BROTLI = True
+    except ImportError:
+        HAS_BROTLI = False
+
+# 只宣告 urllib3 能解壓縮的編碼，伺服器才不會回傳無法讀取的內容
+ACCEPT_ENCODING = "br, gzip, deflate" if HAS_BROTLI else "gzip, deflate"
+CHUNK_SIZE = 64 * 1024
+
+
+def loads(data: bytes) -> Any:
+    """從位元組解析 JSON，不先轉成字串"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class _ChunkReader:
+    """把位元組片段包裝成檔案介面供 ijson 讀取"""
+    
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = b""
+    
+    def read(self, size: int = -1) -> bytes:
+        while not self._pending:
+            self._pending = next(self._chunks, None)
+            if self._pending is None:
+                self._pending = b""
+                return b""
+        if size < 0 or size >= len(self._pending):
+            data, self._pending = self._pending, b""
+        else:
+            data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+
+class RecordStream:
+    """
+    讀取回應中的紀錄
+    
+    頂層為陣列時（例如 swapi.info 一次回傳整個集合）直接作為紀錄；為物件時取出 results_key 的內容，並保留分頁的 next。
+    預設讀完整個回應後一次解析，解碼最快；incremental=True 且安裝 ijson 時，大型陣列改為邊下載邊逐筆解析，
+    不同時保留原始內容與所有解析結果，但解碼較慢
+    """
+    
+    def __init__(self, response, results_key: str = "results", incremental: bool = False,
+                 chunk_size: int = CHUNK_SIZE):
+        self.response = response
+        self.results_key = results_key
+        self.incremental = incremental and ijson is not None
+        self.chunk_size = chunk_size
+        self.next = None
+        self.bytes_read = 0
+    
+    def _chunks(self) -> Iterator[bytes]:
+        # iter_content 會依 Content-Encoding 解壓縮
+        for chunk in self.response.iter_content(self.chunk_size):
+            self.bytes_read += len(chunk)
+            yield chunk
+    
+    def _records(self, data: Any) -> Iterator[Dict[str, Any]]:
+        if isinstance(data, list):
+            return iter(data)
+        self.next = data.get("next")
+        return iter(data.get(self.results_key, []))
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if not self.incremental:
+            content = self.response.content
+            self.bytes_read = len(content)
+            return self._records(loads(content))
+        return self._iter_incremental()
+    
+    def _iter_incremental(self) -> Iterator[Dict[str, Any]]:
+        chunks = self._chunks()
+        head = b""
+        for chunk in chunks:
+            head += chunk
+            if head.lstrip():
+                break
+        body = itertools.chain([head], chunks)
+        if head.lstrip().startswith(b"["):
+            yield from ijson.items(_ChunkReader(body), "item", use_float=True)
+        else:
+            yield from self._records(loads(b"".join(body)))
+
+
+def wire_bytes(response) -> Optional[int]:
+    """實際從網路讀取的（壓縮後）位元組數，無法取得時回傳 None"""
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError):
+        return None
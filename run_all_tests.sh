@@ -62,144 +62,19 @@ create_directories() {
     print_success "目錄建立完成"
 }
 
-# 執行 API 自動化測試
-run_api_tests() {
-    print_header "執行 API 自動化測試"
+# 平行執行 API 與 UI 測試套件並生成總結報告
+run_test_suites() {
+    print_header "執行自動化測試套件"
     
-    if [ ! -d "api-automation" ]; then
-        print_error "api-automation 目錄不存在"
-        return 1
-    fi
-    
-    cd api-automation
-    
-    # 安裝依賴
-    print_info "安裝 API 測試依賴..."
-    pip install -r requirements.txt > ../logs/api_install.log 2>&1
-    
-    # 執行直接分析
-    print_info "執行 API 分析..."
-    python api_automation.py > ../logs/api_analysis.log 2>&1
-    if [ $? -eq 0 ]; then
-        print_success "API 分析完成"
-        cat ../logs/api_analysis.log
-    else
-        print_error "API 分析失敗，請查看 logs/api_analysis.log"
-        return 1
-    fi
-    
-    # 執行測試套件
-    print_info "執行 API 測試套件..."
-    pytest -v --html=../reports/api_report.html --self-contained-html --cov=. --cov-report=html:../reports/api_coverage --cov-report=term-missing > ../logs/api_test.log 2>&1
-    if [ $? -eq 0 ]; then
-        print_success "API 測試套件執行完成"
-        print_info "報告已生成: reports/api_report.html"
-    else
-        print_error "API 測試套件執行失敗，請查看 logs/api_test.log"
-        return 1
-    fi
-    
-    cd ..
-    return 0
-}
-
-# 執行 UI 自動化測試
-run_ui_tests() {
-    print_header "執行 UI 自動化測試"
-    
-    if [ ! -d "ui-automation" ]; then
-        print_error "ui-automation 目錄不存在"
-        return 1
-    fi
-    
-    cd ui-automation
-    
-    # 環境設定
+    # 環境設定（已完成的步驟會依指紋略過）
     print_info "設定 UI 測試環境..."
-    python setup_environment.py > ../logs/ui_setup.log 2>&1
-    if [ $? -ne 0 ]; then
+    if ! python setup_environment.py > logs/ui_setup.log 2>&1; then
         print_warning "環境設定遇到問題，但繼續執行測試"
-        cat ../logs/ui_setup.log
-    fi
-    
-    # 安裝依賴
-    print_info "安裝 UI 測試依賴..."
-    pip install -r requirements.txt > ../logs/ui_install.log 2>&1
-    
-    # 執行直接分析
-    print_info "執行 UI 分析..."
-    timeout 300 python ui_automation.py > ../logs/ui_analysis.log 2>&1
-    if [ $? -eq 0 ]; then
-        print_success "UI 分析完成"
-        cat ../logs/ui_analysis.log
-    else
-        print_warning "UI 分析遇到問題，請查看 logs/ui_analysis.log"
-        # UI 測試可能因為網路或權限問題失敗，但不中斷整個流程
-    fi
-    
-    # 執行測試套件
-    print_info "執行 UI 測試套件..."
-    timeout 600 pytest -v --html=../reports/ui_report.html --self-contained-html --cov=. --cov-report=html:../reports/ui_coverage --cov-report=term-missing > ../logs/ui_test.log 2>&1
-    if [ $? -eq 0 ]; then
-        print_success "UI 測試套件執行完成"
-        print_info "報告已生成: reports/ui_report.html"
-    else
-        print_warning "UI 測試套件執行遇到問題，請查看 logs/ui_test.log"
-        # 同樣不中斷流程
+        cat logs/ui_setup.log
     fi
     
-    cd ..
-    return 0
-}
-
-# 生成整合報告
-generate_summary() {
-    print_header "生成測試總結報告"
-    
-    cat > reports/test_summary.md << EOF
-# Hahow Quality Engineer - 測試執行總結報告
-
-**執行時間**: $(date "+%Y-%m-%d %H:%M:%S")
-**執行環境**: $(uname -s) $(uname -r)
-**Python 版本**: $(python --version)
-
-## 測試結果概覽
-
-### API 自動化測試
-- **狀態**: $([ -f "reports/api_report.html" ] && echo "✅ 完成" || echo "❌ 失敗")
-- **報告**: [API 測試報告](./api_report.html)
-- **覆蓋率**: [API 覆蓋率報告](./api_coverage/index.html)
-
-### UI 自動化測試
-- **狀態**: $([ -f "reports/ui_report.html" ] && echo "✅ 完成" || echo "⚠️ 部分完成")
-- **報告**: [UI 測試報告](./ui_report.html)
-- **覆蓋率**: [UI 覆蓋率報告](./ui_coverage/index.html)
-
-## 執行日誌
-- API 分析日誌: [api_analysis.log](../logs/api_analysis.log)
-- API 測試日誌: [api_test.log](../logs/api_test.log)
-- UI 分析日誌: [ui_analysis.log](../logs/ui_analysis.log)
-- UI 測試日誌: [ui_test.log](../logs/ui_test.log)
-
-## 測試功能驗證
-
-### ✅ API 測試完成項目
-1. Star Wars API 連接性驗證
-2. 第六部電影種族數量分析
-3. 電影集數排序功能
-4. 高馬力車輛篩選功能
-
-### ✅ UI 測試完成項目
-1. GitHub 專案可存取性驗證
-2. 專案合作者統計分析
-3. frontend.md Wireframe 圖片檢查
-4. 最後 commit 作者識別
-
----
-**報告生成時間**: $(date "+%Y-%m-%d %H:%M:%S")
-EOF
-
-    print_success "測試總結報告已生成: reports/test_summary.md"
+    # 兩個套件各自在獨立行程執行，輸出即時加上 [api] / [ui] 前綴
+    python run_tests.py "$@"
 }
 
 # 顯示執行結果
@@ -211,12 +86,12 @@ show_results() {
     echo "├── 📊 UI 測試報告: reports/ui_report.html"
     echo "├── 📈 API 覆蓋率: reports/api_coverage/index.html"
     echo "├── 📈 UI 覆蓋率: reports/ui_coverage/index.html"
+    echo "├── 📈 整體覆蓋率: reports/coverage/index.html"
     echo "└── 📋 測試總結: reports/test_summary.md"
     
     echo -e "\n${BLUE}📁 執行日誌文件：${NC}"
-    echo "├── 🔍 API 分析: logs/api_analysis.log"
+    echo "├── ⚙️  環境設定: logs/ui_setup.log"
     echo "├── 🧪 API 測試: logs/api_test.log"
-    echo "├── 🔍 UI 分析: logs/ui_analysis.log"
     echo "└── 🧪 UI 測試: logs/ui_test.log"
     
     echo -e "\n${YELLOW}💡 使用建議：${NC}"
@@ -236,43 +111,18 @@ main() {
     check_python
     create_directories
     
-    # 記錄開始時間
-    START_TIME=$(date +%s)
-    
-    # 執行測試
-    API_SUCCESS=0
-    UI_SUCCESS=0
-    
-    if run_api_tests; then
-        API_SUCCESS=1
-    fi
-    
-    if run_ui_tests; then
-        UI_SUCCESS=1
-    fi
-    
-    # 生成報告
-    generate_summary
-    
-    # 計算執行時間
-    END_TIME=$(date +%s)
-    EXECUTION_TIME=$((END_TIME - START_TIME))
+    # 執行測試（run_tests.py 只有在 API 測試失敗時回傳非零）
+    TEST_STATUS=0
+    run_test_suites "$@" || TEST_STATUS=$?
     
     # 顯示結果
     show_results
     
-    echo -e "\n${BLUE}⏱️  總執行時間: ${EXECUTION_TIME} 秒${NC}"
-    
     # 執行總結
-    if [ $API_SUCCESS -eq 1 ] && [ $UI_SUCCESS -eq 1 ]; then
-        print_success "所有測試執行完成！"
-        echo -e "\n${GREEN}🎉 恭喜！您的自動化測試專案已成功運行${NC}"
-        echo -e "${GREEN}   這展現了您在 Quality Engineering 方面的專業能力${NC}"
-    elif [ $API_SUCCESS -eq 1 ]; then
-        print_warning "API 測試完成，UI 測試部分遇到問題"
-        echo -e "\n${YELLOW}🔧 建議檢查瀏覽器安裝和網路連接狀況${NC}"
+    if [ $TEST_STATUS -eq 0 ]; then
+        print_success "測試執行完成！各套件狀態請見 reports/test_summary.md"
     else
-        print_error "測試執行遇到問題，請查看日誌文件"
+        print_error "API 測試執行遇到問題，請查看日誌文件"
         echo -e "\n${RED}🆘 請查看 logs/ 目錄下的錯誤日誌${NC}"
         exit 1
     fi
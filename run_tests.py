@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Hahow Quality Engineer 測試執行器
+API 與 UI 測試套件各自在獨立的 pytest 行程中平行執行，即時輸出進度，
+並將 JUnit、HTML 與覆蓋率結果整合成 reports/test_summary.md
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+REPORTS_DIR = "reports"
+LOGS_DIR = "logs"
+SUMMARY_PATH = os.path.join(REPORTS_DIR, "test_summary.md")
+
+# 測試套件設定；未指定 --suite 一起執行時，required 為 False 的套件失敗只發出警告（UI 測試可能受網路或瀏覽器影響）
+SUITES = {
+    "api": {
+        "title": "API 自動化測試",
+        "targets": ["api_automation.py"],
+        "timeout": 300,
+        "required": True,
+    },
+    "ui": {
+        "title": "UI 自動化測試",
+        "targets": ["ui_automation.py"],
+        "timeout": 600,
+        "required": False,
+    },
+    # 批次爬取、瀏覽器工具與測試外掛的單元測試不需要瀏覽器，與 UI 測試分開平行執行
+    "unit": {
+        "title": "工具單元測試",
+        "targets": ["batch_crawl.py", "duration_history.py", "perf_profiler.py", "ui_backends.py", "github_capture.py", "selector_registry.py", "ui_tracing.py", "screenshot_pipeline.py", "change_detection.py"],
+        "timeout": 300,
+        "required": True,
+    },
+}
+
+_print_lock = threading.Lock()
+
+
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+def suite_outputs(name: str) -> Dict[str, str]:
+    """每個套件的報告與日誌路徑"""
+    return {
+        "junit": os.path.join(REPORTS_DIR, f"{name}_junit.xml"),
+        "html": os.path.join(REPORTS_DIR, f"{name}_report.html"),
+        "coverage_html": os.path.join(REPORTS_DIR, f"{name}_coverage"),
+        "coverage_xml": os.path.join(REPORTS_DIR, f"{name}_coverage.xml"),
+        "coverage_data": os.path.join(REPORTS_DIR, f"{name}.coverage"),
+        "analysis": os.path.join(REPORTS_DIR, f"{name}_analysis.json"),
+        "result": os.path.join(REPORTS_DIR, f"{name}_result.json"),
+        "log": os.path.join(LOGS_DIR, f"{name}_test.log"),
+    }
+
+
+def build_command(name: str, suite: Dict[str, Any], extra_args: List[str] = None) -> List[str]:
+    """
+    組出套件的 pytest 指令，未安裝的報告外掛會自動略過
+    
+    以 -o addopts= 忽略 pytest.ini 中寫死的 HTML 與覆蓋率選項（未安裝外掛時會失敗，且各套件會寫到同一個位置），
+    改由各套件分別指定輸出位置；覆蓋率資料檔由 run_suite 以 COVERAGE_FILE 分開
+    """
+    outputs = suite_outputs(name)
+    command = [sys.executable, "-m", "pytest", *suite["targets"], "-o", "addopts=", "-v", "--tb=short",
+               f"--junitxml={outputs['junit']}", f"--analysis-json={outputs['analysis']}"]
+    if _has_module("pytest_html"):
+        command += [f"--html={outputs['html']}", "--self-contained-html"]
+    if _has_module("pytest_cov"):
+        command += ["--cov=.", f"--cov-report=html:{outputs['coverage_html']}",
+                    f"--cov-report=xml:{outputs['coverage_xml']}", "--cov-report=term-missing"]
+    return command + list(extra_args or [])
+
+
+def _emit(name: str, line: str):
+    with _print_lock:
+        print(f"[{name}] {line}", flush=True)
+
+
+def run_suite(name: str, suite: Dict[str, Any], extra_args: List[str] = None) -> Dict[str, Any]:
+    """在獨立行程執行套件，逐行轉送輸出並寫入日誌，逾時則終止"""
+    outputs = suite_outputs(name)
+    command = build_command(name, suite, extra_args)
+    # 各套件使用獨立的覆蓋率資料檔，平行執行時不會互相覆寫
+    env = dict(os.environ, COVERAGE_FILE=outputs["coverage_data"], PYTHONUNBUFFERED="1")
+    # 移除上次留下的結果，避免逾時或中斷時誤讀舊報告
+    for key in ("junit", "coverage_xml", "analysis"):
+        if os.path.exists(outputs[key]):
+            os.remove(outputs[key])
+    started = time.monotonic()
+    _emit(name, f"開始執行: {' '.join(command)}")
+    
+    with open(outputs["log"], "w", encoding="utf-8") as log:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, encoding="utf-8", errors="replace", env=env)
+        
+        def pump():
+            for line in process.stdout:
+                log.write(line)
+                _emit(name, line.rstrip("\n"))
+        
+        reader = threading.Thread(target=pump, name=f"{name}-output", daemon=True)
+        reader.start()
+        timed_out = False
+        try:
+            returncode = process.wait(timeout=suite["timeout"])
+        except subprocess.TimeoutExpired:
+            timed_out = True
+            process.kill()
+            returncode = process.wait()
+            _emit(name, f"⚠ 超過 {suite['timeout']} 秒，已終止")
+        reader.join(timeout=5)
+    
+    duration = time.monotonic() - started
+    # 保存執行結果，之後的 CI job 可直接用 --summary-only 整合報告
+    with open(outputs["result"], "w", encoding="utf-8") as f:
+        json.dump({"returncode": returncode, "timed_out": timed_out, "duration": duration}, f)
+    _emit(name, f"結束（exit {returncode}，{duration:.1f} 秒）")
+    return load_result(name)
+
+
+def load_result(name: str) -> Optional[Dict[str, Any]]:
+    """讀取套件已產生的執行結果與報告，尚未執行時回傳 None"""
+    outputs = suite_outputs(name)
+    try:
+        with open(outputs["result"], encoding="utf-8") as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        return None
+    result.update({
+        "name": name,
+        "junit": parse_junit(outputs["junit"]),
+        "coverage": parse_coverage(outputs["coverage_xml"]),
+    })
+    return result
+
+
+def parse_junit(path: str) -> Optional[Dict[str, Any]]:
+    """彙總 JUnit XML 的測試數量"""
+    try:
+        root = ET.parse(path).getroot()
+    except (OSError, ET.ParseError):
+        return None
+    
+    suites = [root] if root.tag == "testsuite" else root.findall("testsuite")
+    totals = {"tests": 0, "failures": 0, "errors": 0, "skipped": 0, "time": 0.0, "failed_cases": []}
+    for suite in suites:
+        for key in ("tests", "failures", "errors", "skipped"):
+            totals[key] += int(suite.get(key, 0))
+        totals["time"] += float(suite.get("time", 0))
+        for case in suite.iter("testcase"):
+            if case.find("failure") is not None or case.find("error") is not None:
+                totals["failed_cases"].append(f"{case.get('classname')}::{case.get('name')}")
+    totals["passed"] = totals["tests"] - totals["failures"] - totals["errors"] - totals["skipped"]
+    return totals
+
+
+def parse_coverage(path: str) -> Optional[float]:
+    """讀取 coverage XML 的行覆蓋率（百分比）"""
+    try:
+        return round(float(ET.parse(path).getroot().get("line-rate", 0)) * 100, 1)
+    except (OSError, ET.ParseError, ValueError):
+        return None
+
+
+def combine_coverage(names: List[str]) -> Optional[float]:
+    """合併各套件的覆蓋率資料，輸出整體 HTML 與 XML 報告"""
+    data_files = [suite_outputs(name)["coverage_data"] for name in names]
+    data_files = [path for path in data_files if os.path.exists(path)]
+    if not data_files or not _has_module("coverage"):
+        return None
+    
+    xml_path = os.path.join(REPORTS_DIR, "coverage.xml")
+    commands = [
+        [sys.executable, "-m", "coverage", "combine", "--keep"] + data_files,
+        [sys.executable, "-m", "coverage", "html", "-d", os.path.join(REPORTS_DIR, "coverage")],
+        [sys.executable, "-m", "coverage", "xml", "-o", xml_path],
+    ]
+    for command in commands:
+        if subprocess.run(command, capture_output=True, text=True).returncode != 0:
+            return None
+    return parse_coverage(xml_path)
+
+
+def _status(result: Dict[str, Any], required: bool) -> str:
+    if result["timed_out"]:
+        return "⏱️ 逾時"
+    if result["returncode"] == 0:
+        return "✅ 通過"
+    return "❌ 失敗" if required else "⚠️ 部分完成"
+
+
+def write_summary(results: List[Dict[str, Any]], total_coverage: Optional[float], wall_time: float) -> str:
+    """產生整合的測試總結報告"""
+    lines = [
+        "# Hahow Quality Engineer - 測試執行總結報告",
+        "",
+        f"**執行時間**: {datetime.now():%Y-%m-%d %H:%M:%S}",
+        f"**執行環境**: {platform.system()} {platform.release()}",
+        f"**Python 版本**: {platform.python_version()}",
+        f"**總執行時間**: {wall_time:.1f} 秒（各套件合計 {sum(r['duration'] for r in results):.1f} 秒）",
+        "",
+        "## 測試結果概覽",
+        "",
+        "| 套件 | 狀態 | 通過 | 失敗 | 錯誤 | 略過 | 耗時 (秒) | 覆蓋率 |",
+        "|------|------|------|------|------|------|-----------|--------|",
+    ]
+    for result in results:
+        suite = SUITES[result["name"]]
+        junit = result["junit"] or {}
+        coverage = f"{result['coverage']}%" if result["coverage"] is not None else "-"
+        lines.append(
+            f"| {suite['title']} | {_status(result, suite['required'])} | {junit.get('passed', '-')} "
+            f"| {junit.get('failures', '-')} | {junit.get('errors', '-')} | {junit.get('skipped', '-')} "
+            f"| {result['duration']:.1f} | {coverage} |"
+        )
+    if total_coverage is not None:
+        lines += ["", f"**整體覆蓋率**: {total_coverage}%（[合併覆蓋率報告](./coverage/index.html)）"]
+    
+    for result in results:
+        suite = SUITES[result["name"]]
+        outputs = suite_outputs(result["name"])
+        lines += ["", f"### {suite['title']}", ""]
+        if os.path.exists(outputs["html"]):
+            lines.append(f"- **報告**: [{os.path.basename(outputs['html'])}](./{os.path.basename(outputs['html'])})")
+        if os.path.exists(os.path.join(outputs["coverage_html"], "index.html")):
+            lines.append(f"- **覆蓋率**: [{os.path.basename(outputs['coverage_html'])}]"
+                         f"(./{os.path.basename(outputs['coverage_html'])}/index.html)")
+        lines.append(f"- **JUnit**: [{os.path.basename(outputs['junit'])}](./{os.path.basename(outputs['junit'])})")
+        if os.path.exists(outputs["analysis"]):
+            lines.append(f"- **分析結果**: [{os.path.basename(outputs['analysis'])}]"
+                         f"(./{os.path.basename(outputs['analysis'])})")
+        lines.append(f"- **日誌**: [{os.path.basename(outputs['log'])}](../{outputs['log']})")
+        for case in (result["junit"] or {}).get("failed_cases", []):
+            lines.append(f"- ❌ `{case}`")
+    
+    lines += [
+        "",
+        "## 測試功能驗證",
+        "",
+        "### API 測試項目",
+        "1. Star Wars API 連接性驗證",
+        "2. 第六部電影種族數量分析",
+        "3. 電影集數排序功能",
+        "4. 高馬力車輛篩選功能",
+        "",
+        "### UI 測試項目",
+        "1. GitHub 專案可存取性驗證",
+        "2. 專案合作者統計分析",
+        "3. frontend.md Wireframe 圖片檢查",
+        "4. 最後 commit 作者識別",
+    ]
+    lines += ["", "---", f"**報告生成時間**: {datetime.now():%Y-%m-%d %H:%M:%S}", ""]
+    with open(SUMMARY_PATH, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    return SUMMARY_PATH
+
+
+def main() -> int:
+    """主要執行函數"""
+    parser = argparse.ArgumentParser(description="平行執行 API、UI 與工具單元測試套件並整合報告")
+    parser.add_argument("--suite", action="append", choices=list(SUITES), dest="suites",
+                        help="要執行的套件，可重複指定（預設全部）")
+    parser.add_argument("--workers", type=int, default=len(SUITES), help="同時執行的套件數")
+    for name, suite in SUITES.items():
+        parser.add_argument(f"--{name}-timeout", type=int, default=suite["timeout"],
+                            help=f"{suite['title']} 的逾時秒數（預設 {suite['timeout']}）")
+    parser.add_argument("--summary-only", action="store_true",
+                        help="不執行測試，只用 reports/ 中既有的結果整合總結報告")
+    parser.add_argument("pytest_args", nargs=argparse.REMAINDER, help="-- 之後的參數直接傳給 pytest")
+    args = parser.parse_args()
+    
+    names = args.suites or list(SUITES)
+    extra_args = [arg for arg in args.pytest_args if arg != "--"]
+    for name in names:
+        SUITES[name]["timeout"] = getattr(args, f"{name}_timeout")
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    os.makedirs(LOGS_DIR, exist_ok=True)
+    
+    started = time.monotonic()
+    if args.summary_only:
+        results = [result for result in map(load_result, names) if result]
+        if not results:
+            print(f"✗ {REPORTS_DIR}/ 中沒有任何套件的執行結果")
+            return 1
+        wall_time = max(result["duration"] for result in results)
+    else:
+        print(f"🚀 平行執行測試套件: {', '.join(names)}（workers={args.workers}）")
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            results = list(executor.map(lambda name: run_suite(name, SUITES[name], extra_args), names))
+        wall_time = time.monotonic() - started
+    
+    summary_path = write_summary(results, combine_coverage(names), wall_time)
+    print(f"\n📋 測試總結報告: {summary_path}")
+    for result in results:
+        print(f"  {SUITES[result['name']]['title']}: {_status(result, SUITES[result['name']]['required'])}"
+              f"（{result['duration']:.1f} 秒）")
+    print(f"⏱️  總執行時間: {wall_time:.1f} 秒")
+    
+    # 明確以 --suite 指定時（例如 CI 各套件的 job）回傳該套件本身的結束碼，非必要套件失敗同樣視為失敗
+    if args.suites:
+        failed = [r["returncode"] for r in results if r["returncode"] != 0]
+        return (failed[0] if failed[0] > 0 else 1) if failed else 0
+    failed_required = [r for r in results if SUITES[r["name"]]["required"] and r["returncode"] != 0]
+    return 1 if failed_required else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -24,17 +24,8 @@ fi
 echo "開始執行 UI 自動化測試..."
 echo ""
 
-# 直接執行分析
-echo "1. 執行直接分析..."
-python3 ui_automation.py
-
-echo ""
-echo "2. 執行 pytest 測試套件..."
-pytest ui_automation.py -v --tb=short
-
-echo ""
-echo "3. 生成 HTML 測試報告..."
-pytest ui_automation.py --html=reports/ui_report.html --self-contained-html
+# 單次 pytest 執行同時產生分析報告、HTML、JUnit 與覆蓋率
+python3 run_tests.py --suite ui
 
 echo ""
 echo "=== 測試完成 ==="
@@ -0,0 +1,287 @@
+"""
+UI 測試截圖管線
+測試執行緒只負責擷取原始 PNG 並以原始位元組計算雜湊，解碼、像素比對、壓縮與寫檔交給背景執行緒；
+重複畫面不再保存，screenshots/ 目錄維持在容量與保存天數預算內
+"""
+
+import atexit
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List
+
+import pytest
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None  # 未安裝 Pillow 時直接保存原始 PNG
+
+DEFAULT_SCREENSHOT_DIR = "screenshots"
+DEFAULT_MAX_BYTES = int(float(os.environ.get("UI_SCREENSHOT_MAX_MB", "50")) * 1024 * 1024)
+DEFAULT_MAX_AGE_DAYS = float(os.environ.get("UI_SCREENSHOT_MAX_AGE_DAYS", "7"))
+DEFAULT_MAX_WIDTH = int(os.environ.get("UI_SCREENSHOT_MAX_WIDTH", "1280"))
+SCREENSHOT_MODES = ("failure", "always", "off")
+
+# 檔名結尾的雜湊用於跨執行辨識重複畫面
+_HASH_SUFFIX = re.compile(r'_([0-9a-f]{12})\.png$')
+
+
+def image_hash(png_bytes: bytes) -> str:
+    """以原始位元組計算畫面雜湊，不解碼圖片，可在測試執行緒上計算"""
+    return hashlib.sha1(png_bytes).hexdigest()[:12]
+
+
+class ScreenshotPipeline:
+    """背景壓縮、去重並控制容量的截圖儲存"""
+    
+    def __init__(self, directory: str = DEFAULT_SCREENSHOT_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS, max_width: int = DEFAULT_MAX_WIDTH):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.max_width = max_width
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot")
+        self._pending = []
+        self._lock = threading.Lock()
+        self.stats = {"captured": 0, "duplicates": 0, "written": 0, "pruned": 0}
+        os.makedirs(directory, exist_ok=True)
+        self._seen = self._scan_existing()
+        self._pixels = {}  # 像素雜湊 -> 本次執行寫入的檔案，只在背景執行緒中計算
+    
+    def _scan_existing(self) -> Dict[str, str]:
+        """從既有檔名還原雜湊索引"""
+        seen = {}
+        for name in os.listdir(self.directory):
+            match = _HASH_SUFFIX.search(name)
+            if match:
+                seen[match.group(1)] = os.path.join(self.directory, name)
+        return seen
+    
+    def submit(self, png_bytes: bytes, label: str = None) -> str:
+        """排入一張截圖，回傳最終檔案路徑（重複畫面回傳既有檔案）"""
+        digest = image_hash(png_bytes)
+        with self._lock:
+            self.stats["captured"] += 1
+            if digest in self._seen:
+                self.stats["duplicates"] += 1
+                return self._seen[digest]
+            
+            label = re.sub(r'[^\w.-]+', '_', label or f"screenshot_{datetime.now():%Y%m%d_%H%M%S}")
+            filepath = os.path.join(self.directory, f"{label.rsplit('.png', 1)[0]}_{digest}.png")
+            self._seen[digest] = filepath
+            self._pending.append(self._executor.submit(self._write, png_bytes, filepath))
+        return filepath
+    
+    def _pixel_digest(self, png_bytes: bytes) -> str:
+        """以像素內容計算雜湊，編碼不同但畫面相同的截圖視為重複；未安裝 Pillow 或無法解碼時回傳空字串"""
+        if Image is None:
+            return ""
+        try:
+            with Image.open(io.BytesIO(png_bytes)) as image:
+                return hashlib.sha1(image.convert("RGB").tobytes()).hexdigest()[:12]
+        except OSError:
+            return ""
+    
+    def _link_duplicate(self, pixels: str, filepath: str) -> bool:
+        """畫面與已寫入的檔案相同時建立硬連結，不另外佔用空間"""
+        with self._lock:
+            existing = self._pixels.get(pixels)
+        if not existing:
+            return False
+        try:
+            os.link(existing, filepath)
+        except OSError:
+            return False
+        with self._lock:
+            self.stats["duplicates"] += 1
+        return True
+    
+    def _encode(self, png_bytes: bytes) -> bytes:
+        """縮小過寬的畫面並以最佳化 PNG 重新編碼"""
+        if Image is None:
+            return png_bytes
+        
+        with Image.open(io.BytesIO(png_bytes)) as image:
+            if self.max_width and image.width > self.max_width:
+                image = image.resize((self.max_width, round(image.height * self.max_width / image.width)))
+            output = io.BytesIO()
+            image.save(output, format="PNG", optimize=True)
+        return output.getvalue() if output.tell() < len(png_bytes) else png_bytes
+    
+    def _write(self, png_bytes: bytes, filepath: str):
+        pixels = self._pixel_digest(png_bytes)
+        if pixels and self._link_duplicate(pixels, filepath):
+            return
+        try:
+            data = self._encode(png_bytes)
+        except OSError:
+            data = png_bytes
+        with open(filepath, "wb") as f:
+            f.write(data)
+        with self._lock:
+            self.stats["written"] += 1
+            if pixels:
+                self._pixels[pixels] = filepath
+        self.enforce_budget(keep=filepath)
+    
+    def enforce_budget(self, keep: str = None):
+        """
+        刪除過期檔案，並由舊到新刪除直到總容量低於預算
+        
+        硬連結的重複畫面會重複計入容量，估計值只會偏高，實際用量不會超過預算
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.endswith(".png") and os.path.isfile(path):
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+        
+        expires_before = time.time() - self.max_age_days * 86400
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            if path == keep:
+                continue
+            if mtime >= expires_before and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.stats["pruned"] += 1
+                match = _HASH_SUFFIX.search(path)
+                if match and self._seen.get(match.group(1)) == path:
+                    del self._seen[match.group(1)]
+                for pixels, written in list(self._pixels.items()):
+                    if written == path:
+                        del self._pixels[pixels]
+    
+    def flush(self, timeout: float = None):
+        """等待所有排隊中的截圖寫入完成"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for future in pending:
+            try:
+                future.result(timeout=timeout)
+            except Exception as e:
+                print(f"警告: 截圖寫入失敗: {e}")
+    
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
+
+
+_pipelines = {}
+
+
+def get_pipeline(directory: str = DEFAULT_SCREENSHOT_DIR) -> ScreenshotPipeline:
+    """同一目錄共用一個截圖管線"""
+    if directory not in _pipelines:
+        _pipelines[directory] = ScreenshotPipeline(directory)
+    return _pipelines[directory]
+
+
+@atexit.register
+def _flush_all():
+    for pipeline in _pipelines.values():
+        pipeline.flush()
+
+
+class TestScreenshotPipeline:
+    """截圖管線測試"""
+    
+    def test_screenshot_pipeline_dedup_and_budget(self, tmp_path):
+        """測試：截圖管線去除重複畫面並維持目錄容量預算"""
+        pipeline = ScreenshotPipeline(str(tmp_path), max_bytes=250)
+        first = pipeline.submit(b"a" * 100, "test_one_failure")
+        assert pipeline.submit(b"a" * 100, "test_two_failure") == first
+        pipeline.submit(b"b" * 100, "test_three_failure")
+        pipeline.submit(b"c" * 100, "test_four_failure")
+        pipeline.flush()
+        
+        assert pipeline.stats["duplicates"] == 1
+        assert sum(f.stat().st_size for f in tmp_path.iterdir()) <= 250
+        assert not os.path.exists(first)
+    
+    def test_screenshot_pipeline_links_same_pixels(self, tmp_path):
+        """測試：編碼不同但畫面相同的截圖在背景執行緒中比對像素，以硬連結保存"""
+        pipeline = ScreenshotPipeline(str(tmp_path))
+        pipeline._pixel_digest = lambda png_bytes: png_bytes[:1].hex()  # 以第一個位元組代表畫面內容
+        first = pipeline.submit(b"a" * 100, "test_one_failure")
+        second = pipeline.submit(b"a" * 50, "test_two_failure")
+        pipeline.flush()
+        
+        assert first != second and os.path.samefile(first, second)
+        assert (pipeline.stats["written"], pipeline.stats["duplicates"]) == (1, 1)
+
+
+# --- pytest 外掛：只在失敗或明確要求時截圖 ---
+
+def pytest_addoption(parser):
+    parser.addoption("--screenshots", choices=SCREENSHOT_MODES, default="failure",
+                     help="UI 測試截圖時機: failure（預設，僅失敗時）、always 或 off")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "screenshot: 測試結束時無論成敗都截圖")
+
+
+def _screenshot_clients(item) -> List:
+    """從測試使用的 fixture 中找出可截圖的 UI 客戶端（GitHubUIClient 或持有它的分析器）"""
+    clients = []
+    for value in getattr(item, "funcargs", {}).values():
+        client = value if hasattr(value, "take_screenshot") else getattr(value, "client", None)
+        if client is not None and hasattr(client, "take_screenshot") and client not in clients:
+            clients.append(client)
+    return clients
+
+
+def _should_capture(item, report) -> bool:
+    mode = item.config.getoption("--screenshots")
+    if mode == "off":
+        return False
+    if report.failed and report.when in ("setup", "call"):
+        return True
+    return report.when == "call" and (mode == "always" or item.get_closest_marker("screenshot") is not None)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    if not _should_capture(item, report):
+        return
+    
+    for index, client in enumerate(_screenshot_clients(item)):
+        suffix = "failure" if report.failed else "final"
+        try:
+            path = client.take_screenshot(f"{item.name}_{suffix}_{index}" if index else f"{item.name}_{suffix}")
+        except Exception as e:
+            print(f"警告: 無法擷取 {item.nodeid} 的截圖: {e}")
+            continue
+        if not path:
+            continue
+        report.sections.append(("截圖", path))
+        try:
+            import pytest_html
+        except ImportError:
+            continue
+        report_dir = os.path.dirname(os.path.abspath(item.config.getoption("htmlpath") or "reports/report.html"))
+        report.extras = getattr(report, "extras", []) + [
+            pytest_html.extras.image(os.path.relpath(os.path.abspath(path), report_dir))
+        ]
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionfinish(session):
+    for pipeline in _pipelines.values():
+        pipeline.flush()
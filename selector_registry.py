@@ -0,0 +1,237 @@
+"""
+GitHub DOM 選擇器策略快取
+記錄每種頁面元素最後成功的首選（等價）定位策略並跨執行保存，下次優先嘗試；
+資訊較少的備用策略只在首選策略都找不到時使用，連續多次只有同一個備用策略命中（GitHub 改版）時才升級為優先策略，
+之後不必再等待已失效的首選策略
+"""
+
+import json
+import os
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+DEFAULT_REGISTRY_PATH = os.environ.get("UI_SELECTOR_REGISTRY", os.path.join(".cache", "selector_registry.json"))
+PROMOTE_AFTER = 3  # 同一個備用策略連續命中幾次後升級為優先策略
+
+# 一次往返同時檢查所有候選策略，回傳每個策略目前是否有符合的元素
+PROBE_SCRIPT = """
+const strategies = arguments[0];
+return strategies.map(([by, value]) => {
+    try {
+        if (by === 'xpath') {
+            return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null)
+                .singleNodeValue !== null;
+        }
+        if (by === 'css selector' || by === 'tag name') return document.querySelector(value) !== null;
+        if (by === 'id') return document.getElementById(value) !== null;
+        if (by === 'class name') return document.getElementsByClassName(value).length > 0;
+        if (by === 'name') return document.getElementsByName(value).length > 0;
+    } catch (e) {}
+    return false;
+});
+"""
+
+# 策略格式: (名稱, By, 選擇器, 是否為首選策略)
+# 首選策略彼此等價（取得相同的資訊），可互相取代；備用策略取得的資訊較少或可能選到其他元素
+Strategy = Tuple[str, str, str, bool]
+
+
+class SelectorRegistry:
+    """每個元素鍵記錄優先嘗試的策略與命中統計"""
+    
+    def __init__(self, path: str = DEFAULT_REGISTRY_PATH, promote_after: int = PROMOTE_AFTER):
+        self.path = path
+        self.promote_after = promote_after
+        self.entries = self._load()
+        self._lock = threading.Lock()  # 批次爬取時多個客戶端共用同一個實例
+    
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _entry(self, key: str) -> Dict[str, Any]:
+        return self.entries.setdefault(key, {
+            "winner": None,
+            "first_choice_hits": 0,
+            "fallback_hits": 0,
+            "misses": 0,
+            "fallback_streak": [None, 0],
+            "strategies": {},
+        })
+    
+    def winner(self, key: str) -> Optional[str]:
+        """優先嘗試的策略名稱：最後成功的首選策略，或已升級的備用策略"""
+        return self.entries.get(key, {}).get("winner")
+    
+    def ordered(self, key: str, strategies: List[Strategy]) -> List[Strategy]:
+        """
+        首選策略排在備用策略之前，兩者之中優先嘗試的策略各自排在最前面，其餘維持宣告順序
+        
+        首選策略重新出現時仍會先被採用，升級的備用策略只排在其他備用策略之前
+        """
+        winner = self.winner(key)
+        return sorted(strategies, key=lambda strategy: (not strategy[3], strategy[0] != winner))
+    
+    def record_hit(self, key: str, name: str, preferred: bool):
+        """
+        記錄策略命中
+        
+        首選策略命中即成為優先嘗試的策略；備用策略要連續 promote_after 次命中（期間首選策略都沒有出現）才會升級
+        """
+        with self._lock:
+            entry = self._entry(key)
+            if preferred:
+                entry["first_choice_hits"] += 1
+                entry["winner"] = name
+                entry["fallback_streak"] = [None, 0]
+            else:
+                entry["fallback_hits"] += 1
+                last, count = entry.get("fallback_streak") or [None, 0]
+                count = count + 1 if last == name else 1
+                entry["fallback_streak"] = [name, count]
+                if count >= self.promote_after:
+                    entry["winner"] = name
+            entry["strategies"][name] = entry["strategies"].get(name, 0) + 1
+    
+    def record_miss(self, key: str):
+        """記錄所有策略都沒有命中"""
+        with self._lock:
+            self._entry(key)["misses"] += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        """每個元素鍵的命中統計"""
+        return {
+            key: {
+                "winner": entry["winner"],
+                "first_choice_hits": entry["first_choice_hits"],
+                "fallback_hits": entry["fallback_hits"],
+                "misses": entry["misses"],
+                "hit_rate": (
+                    entry["first_choice_hits"]
+                    / max(1, entry["first_choice_hits"] + entry["fallback_hits"] + entry["misses"])
+                ),
+            }
+            for key, entry in self.entries.items()
+        }
+    
+    def save(self):
+        """寫入檔案（先寫暫存檔再取代，避免中斷時留下損毀的 JSON）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+class TestSelectorRegistry:
+    """選擇器策略快取測試"""
+    
+    def test_selector_registry_prefers_last_winner(self, tmp_path):
+        """測試：選擇器策略快取只記住首選策略，備用策略命中後仍排在首選策略之後，並跨執行保存"""
+        from ui_automation import SELECTOR_STRATEGIES, By
+        
+        path = str(tmp_path / "selector_registry.json")
+        strategies = SELECTOR_STRATEGIES["commits.commit_rows"] + [
+            ("commit_row_list_item", By.CSS_SELECTOR, "li[data-testid='commit-row-item']", True)
+        ]
+        
+        registry = SelectorRegistry(path)
+        assert [name for name, *_ in registry.ordered("commits.commit_rows", strategies)] == [
+            "commit_row_testid", "commit_row_list_item", "commit_item_box_row"
+        ]
+        registry.record_hit("commits.commit_rows", "commit_item_box_row", preferred=False)
+        assert registry.winner("commits.commit_rows") is None
+        registry.record_hit("commits.commit_rows", "commit_row_list_item", preferred=True)
+        registry.record_miss("commits.commit_rows")
+        registry.save()
+        
+        reloaded = SelectorRegistry(path)
+        assert [name for name, *_ in reloaded.ordered("commits.commit_rows", strategies)] == [
+            "commit_row_list_item", "commit_row_testid", "commit_item_box_row"
+        ]
+        stats = reloaded.stats()["commits.commit_rows"]
+        assert stats["winner"] == "commit_row_list_item"
+        assert (stats["first_choice_hits"], stats["fallback_hits"], stats["misses"]) == (1, 1, 1)
+    
+    def test_find_with_strategies_waits_for_preferred(self, tmp_path):
+        """測試：備用策略先出現時仍等待首選策略，首選策略一直沒出現才採用備用策略"""
+        from ui_automation import SELECTOR_STRATEGIES, GitHubUIClient
+        
+        class FakeBackend:
+            def __init__(self, preferred_after):
+                self.polls = 0
+                self.preferred_after = preferred_after
+            
+            def execute_script(self, script, probes):
+                self.polls += 1
+                return [self.polls > self.preferred_after, True]
+            
+            def find_element(self, by, value, timeout):
+                return value
+        
+        client = GitHubUIClient.__new__(GitHubUIClient)
+        client.timeout = 5
+        client.capture_mode = "off"
+        client.selector_registry = SelectorRegistry(str(tmp_path / "selector_registry.json"))
+        strategies = SELECTOR_STRATEGIES["repo_home.contributors"]
+        
+        client.backend, client.probe_timeout = FakeBackend(preferred_after=1), 5
+        assert client.find_with_strategies("repo_home.contributors", strategies)[0] == "contributors_link"
+        
+        client.backend, client.probe_timeout = FakeBackend(preferred_after=100), 0.3
+        assert client.find_with_strategies("repo_home.contributors", strategies)[0] == "sidebar_contributors"
+        assert client.backend.polls > 1
+        assert client.selector_registry.winner("repo_home.contributors") == "contributors_link"
+    
+    def test_selector_registry_promotes_fallback_across_runs(self, tmp_path):
+        """測試：改版後同一個備用策略連續命中即跨執行升級，不再等待失效的首選策略；首選策略恢復後再降級"""
+        from ui_automation import SELECTOR_STRATEGIES, By, GitHubUIClient
+        
+        class FakeBackend:
+            def __init__(self, present):
+                self.present = present
+                self.polls = 0
+            
+            def execute_script(self, script, probes):
+                self.polls += 1
+                return [value in self.present for _, value in probes]
+            
+            def find_element(self, by, value, timeout):
+                return value
+        
+        path = str(tmp_path / "selector_registry.json")
+        key = "commits.commit_rows"
+        strategies = SELECTOR_STRATEGIES[key] + [("commit_list_item", By.CSS_SELECTOR, "li.commit", False)]
+        
+        def run(present):
+            """模擬一次執行：載入保存的快取、尋找一次元素後保存"""
+            client = GitHubUIClient.__new__(GitHubUIClient)
+            client.timeout, client.probe_timeout, client.capture_mode = 5, 0.3, "off"
+            client.selector_registry = SelectorRegistry(path, promote_after=3)
+            client.backend = FakeBackend(present)
+            name, _ = client.find_with_strategies(key, strategies)
+            client.selector_registry.save()
+            return name, client.backend.polls, [name for name, *_ in client.selector_registry.ordered(key, strategies)]
+        
+        for _ in range(2):
+            name, polls, order = run({"li.commit"})
+            assert name == "commit_list_item" and polls > 1
+            assert order == ["commit_row_testid", "commit_item_box_row", "commit_list_item"]
+        
+        name, polls, order = run({"li.commit"})
+        assert name == "commit_list_item" and polls > 1
+        assert order == ["commit_row_testid", "commit_list_item", "commit_item_box_row"]
+        
+        # 升級後第一次輪詢就採用，不必等待 probe_timeout
+        assert run({"li.commit", ".commit-item, .Box-row"})[:2] == ("commit_list_item", 1)
+        
+        # 首選策略重新出現時優先採用，備用策略失去優先順序
+        name, polls, order = run({"li.commit", "[data-testid='commit-row']"})
+        assert (name, polls) == ("commit_row_testid", 1)
+        assert order == ["commit_row_testid", "commit_item_box_row", "commit_list_item"]
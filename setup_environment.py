@@ -6,11 +6,44 @@ Hahow Quality Engineer UI 自動化測試環境設定腳本
 
 import os
 import sys
+import re
+import io
+import json
+import hashlib
+import argparse
+import threading
 import subprocess
 import platform
 import shutil
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from importlib import metadata
 from pathlib import Path
 
+STATE_PATH = os.path.join(".cache", "setup_state.json")
+REQUIREMENTS_FILE = "ui_requirements.txt"
+SETUP_DIRECTORIES = ["screenshots", "logs", "reports"]
+
+class _ThreadLocalStdout:
+    """平行執行步驟時，每個步驟的輸出先寫入各自的緩衝區，完成後再整段印出"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+    
+    def start_capture(self):
+        self._local.buffer = io.StringIO()
+    
+    def stop_capture(self) -> str:
+        buffer, self._local.buffer = self._local.buffer, None
+        return buffer.getvalue()
+    
+    def write(self, text):
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer or self._stream).write(text)
+    
+    def flush(self):
+        self._stream.flush()
+
 def print_step(step, message):
     """打印步驟訊息"""
     print(f"\n{'='*50}")
@@ -89,7 +122,7 @@ def install_python_dependencies():
     print_step(3, "安裝 Python 依賴套件")
     
     # 檢查 requirements.txt 是否存在
-    requirements_file = "ui_requirements.txt"
+    requirements_file = REQUIREMENTS_FILE
     if not os.path.exists(requirements_file):
         print(f"❌ 錯誤: 找不到 {requirements_file}")
         return False
@@ -111,44 +144,36 @@ def setup_chromedriver():
     print_step(4, "設定 ChromeDriver")
     
     try:
-        # 嘗試使用 chromedriver-autoinstaller
         import chromedriver_autoinstaller
-        print("使用 chromedriver-autoinstaller 自動安裝 ChromeDriver...")
-        chromedriver_autoinstaller.install()
-        print("✓ ChromeDriver 自動安裝完成")
-        return True
     except ImportError:
         print("chromedriver-autoinstaller 未安裝，嘗試手動安裝...")
         
         # 手動安裝 chromedriver-autoinstaller
-        if run_command(f"{sys.executable} -m pip install chromedriver-autoinstaller", 
-                      "安裝 chromedriver-autoinstaller"):
-            try:
-                import chromedriver_autoinstaller
-                chromedriver_autoinstaller.install()
-                print("✓ ChromeDriver 手動安裝完成")
-                return True
-            except Exception as e:
-                print(f"❌ ChromeDriver 安裝失敗: {e}")
-                return False
-        else:
+        if not run_command(f"{sys.executable} -m pip install chromedriver-autoinstaller", 
+                           "安裝 chromedriver-autoinstaller"):
             print("❌ 無法安裝 chromedriver-autoinstaller")
             return False
+    
+    try:
+        # 解析結果依 Chrome 版本快取，Chrome 未更新時不會重新下載
+        from driver_resolver import resolve_chromedriver
+        driver_path = resolve_chromedriver()
     except Exception as e:
         print(f"❌ ChromeDriver 設定失敗: {e}")
         return False
+    
+    if not driver_path:
+        print("❌ ChromeDriver 安裝失敗")
+        return False
+    
+    print(f"✓ ChromeDriver 就緒: {driver_path}")
+    return True
 
 def create_directories():
     """創建必要的目錄"""
     print_step(5, "創建必要的目錄")
     
-    directories = [
-        "screenshots",
-        "logs", 
-        "reports"
-    ]
-    
-    for directory in directories:
+    for directory in SETUP_DIRECTORIES:
         try:
             os.makedirs(directory, exist_ok=True)
             print(f"✓ 創建目錄: {directory}")
@@ -165,6 +190,8 @@ def test_selenium_setup():
     try:
         from selenium import webdriver
         from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        from driver_resolver import resolve_chromedriver
         
         print("測試 Chrome WebDriver...")
         chrome_options = Options()
@@ -173,7 +200,9 @@ def test_selenium_setup():
         chrome_options.add_argument('--disable-dev-shm-usage')
         chrome_options.add_argument('--disable-gpu')
         
-        driver = webdriver.Chrome(options=chrome_options)
+        driver_path = resolve_chromedriver()
+        service = Service(executable_path=driver_path) if driver_path else Service()
+        driver = webdriver.Chrome(service=service, options=chrome_options)
         driver.get("https://www.google.com")
         title = driver.title
         driver.quit()
@@ -185,12 +214,7 @@ def test_selenium_setup():
         print(f"❌ Selenium 測試失敗: {e}")
         return False
 
-def create_test_script():
-    """創建測試腳本"""
-    print_step(7, "創建測試腳本")
-    
-    # 創建 run_ui_tests.sh
-    script_content = """#!/bin/bash
+RUN_UI_TESTS_SCRIPT = """#!/bin/bash
 # Hahow Quality Engineer UI 自動化測試執行腳本
 
 echo "=== Hahow Quality Engineer UI 自動化測試 ==="
@@ -216,17 +240,8 @@ fi
 echo "開始執行 UI 自動化測試..."
 echo ""
 
-# 直接執行分析
-echo "1. 執行直接分析..."
-python3 ui_automation.py
-
-echo ""
-echo "2. 執行 pytest 測試套件..."
-pytest ui_automation.py -v --tb=short
-
-echo ""
-echo "3. 生成 HTML 測試報告..."
-pytest ui_automation.py --html=reports/ui_report.html --self-contained-html
+# 單次 pytest 執行同時產生分析報告、HTML、JUnit 與覆蓋率
+python3 run_tests.py --suite ui
 
 echo ""
 echo "=== 測試完成 ==="
@@ -236,6 +251,13 @@ echo "測試報告位置: reports/ui_report.html"
 echo "截圖位置: screenshots/"
 echo "日誌位置: logs/"
 """
+
+def create_test_script():
+    """創建測試腳本"""
+    print_step(7, "創建測試腳本")
+    
+    # 創建 run_ui_tests.sh
+    script_content = RUN_UI_TESTS_SCRIPT
     
     try:
         with open("run_ui_tests.sh", "w", encoding="utf-8") as f:
@@ -249,32 +271,164 @@ echo "日誌位置: logs/"
         print(f"❌ 創建測試腳本失敗: {e}")
         return False
 
+def _hash_text(*parts) -> str:
+    """將多個值組成指紋"""
+    return hashlib.sha256("\n".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:16]
+
+def _file_hash(path) -> str:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    except OSError:
+        return "missing"
+
+def python_fingerprint():
+    """Python 直譯器與版本"""
+    return _hash_text(sys.executable, sys.version)
+
+def chrome_fingerprint():
+    """Chrome 執行檔路徑與檔案狀態（不啟動 Chrome）"""
+    from driver_resolver import find_chrome_binary, file_signature
+    chrome_binary = find_chrome_binary()
+    return _hash_text(chrome_binary, file_signature(chrome_binary))
+
+def requirements_fingerprint():
+    """依賴清單內容與實際安裝的套件版本"""
+    installed = []
+    try:
+        with open(REQUIREMENTS_FILE, encoding="utf-8") as f:
+            names = [re.split(r'[<>=!~\[; ]', line.strip())[0] for line in f if line.strip() and not line.startswith("#")]
+    except OSError:
+        names = []
+    for name in names:
+        try:
+            installed.append(f"{name}=={metadata.version(name)}")
+        except metadata.PackageNotFoundError:
+            installed.append(f"{name}==missing")
+    return _hash_text(python_fingerprint(), _file_hash(REQUIREMENTS_FILE), *installed)
+
+def chromedriver_fingerprint():
+    """Chrome 與快取中的 ChromeDriver 路徑"""
+    from driver_resolver import load_cache, file_signature
+    driver_path = load_cache().get("driver_path")
+    return _hash_text(chrome_fingerprint(), driver_path, file_signature(driver_path))
+
+def directories_fingerprint():
+    return _hash_text(*[os.path.isdir(directory) for directory in SETUP_DIRECTORIES])
+
+def selenium_fingerprint():
+    return _hash_text(requirements_fingerprint(), chromedriver_fingerprint())
+
+def script_fingerprint():
+    return _hash_text(hashlib.sha256(RUN_UI_TESTS_SCRIPT.encode("utf-8")).hexdigest(), _file_hash("run_ui_tests.sh"))
+
+# 步驟相依圖：沒有相依關係的步驟會平行執行；指紋未變更的步驟直接略過
+SETUP_STEPS = {
+    "check_python_version": {"func": check_python_version, "deps": [], "fingerprint": python_fingerprint},
+    "check_chrome_installed": {"func": check_chrome_installed, "deps": [], "fingerprint": chrome_fingerprint},
+    "install_python_dependencies": {
+        "func": install_python_dependencies,
+        "deps": ["check_python_version"],
+        "fingerprint": requirements_fingerprint,
+    },
+    "setup_chromedriver": {
+        "func": setup_chromedriver,
+        "deps": ["check_chrome_installed", "install_python_dependencies"],
+        "fingerprint": chromedriver_fingerprint,
+    },
+    "create_directories": {"func": create_directories, "deps": [], "fingerprint": directories_fingerprint},
+    "test_selenium_setup": {
+        "func": test_selenium_setup,
+        "deps": ["setup_chromedriver", "create_directories"],
+        "fingerprint": selenium_fingerprint,
+    },
+    "create_test_script": {"func": create_test_script, "deps": [], "fingerprint": script_fingerprint},
+}
+
+def load_state():
+    """讀取上次成功步驟的指紋"""
+    try:
+        with open(STATE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    with open(STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+_print_lock = threading.Lock()
+
+def _run_step(name, state, force, stdout):
+    """執行單一步驟：指紋相同時略過，成功後記錄執行後的指紋"""
+    step = SETUP_STEPS[name]
+    stdout.start_capture()
+    try:
+        if not force and state.get(name) and state[name] == step["fingerprint"]():
+            print(f"⏭ {name}: 指紋未變更，略過")
+            return name, True, None
+        
+        try:
+            success = bool(step["func"]())
+        except Exception as e:
+            print(f"❌ 步驟執行異常: {e}")
+            success = False
+        if not success:
+            print("⚠ 步驟失敗，但繼續執行...")
+        return name, success, step["fingerprint"]() if success else None
+    finally:
+        output = stdout.stop_capture()
+        with _print_lock:
+            stdout._stream.write(output)
+            stdout._stream.flush()
+
+def run_steps(force=False, max_workers=4):
+    """依相依圖平行執行所有步驟，回傳每個步驟是否成功"""
+    state = {} if force else load_state()
+    new_state = dict(state)
+    results = {}
+    remaining = dict(SETUP_STEPS)
+    running = {}
+    stdout = _ThreadLocalStdout(sys.stdout)
+    sys.stdout = stdout
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while remaining or running:
+                # 相依步驟完成（不論成敗）後即可開始，與原本失敗也繼續執行的行為一致
+                for name in [n for n, step in remaining.items() if all(dep in results for dep in step["deps"])]:
+                    del remaining[name]
+                    running[executor.submit(_run_step, name, state, force, stdout)] = name
+                
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    name, success, fingerprint = future.result()
+                    results[name] = success
+                    if fingerprint:
+                        new_state[name] = fingerprint
+                    else:
+                        new_state.pop(name, None)
+    finally:
+        sys.stdout = stdout._stream
+    
+    save_state(new_state)
+    return results
+
 def main():
     """主要執行函數"""
+    parser = argparse.ArgumentParser(description="Hahow Quality Engineer UI 自動化測試環境設定")
+    parser.add_argument("--force", action="store_true", help="忽略指紋，重新執行所有步驟")
+    parser.add_argument("--workers", type=int, default=4, help="平行執行的步驟數")
+    args = parser.parse_args()
+    
     print("🚀 Hahow Quality Engineer UI 自動化測試環境設定")
     print("=" * 60)
     
-    steps = [
-        check_python_version,
-        check_chrome_installed,
-        install_python_dependencies,
-        setup_chromedriver,
-        create_directories,
-        test_selenium_setup,
-        create_test_script
-    ]
-    
-    success_count = 0
-    total_steps = len(steps)
-    
-    for step_func in steps:
-        try:
-            if step_func():
-                success_count += 1
-            else:
-                print(f"⚠ 步驟失敗，但繼續執行...")
-        except Exception as e:
-            print(f"❌ 步驟執行異常: {e}")
+    results = run_steps(force=args.force, max_workers=args.workers)
+    success_count = sum(1 for success in results.values() if success)
+    total_steps = len(SETUP_STEPS)
     
     print("\n" + "=" * 60)
     print("🎯 環境設定完成報告")
@@ -293,7 +447,7 @@ def main():
         print("1. 確保已安裝 Google Chrome 瀏覽器")
         print("2. 確保 Python 版本 >= 3.7")
         print("3. 檢查網路連接")
-        print("4. 重新執行此腳本")
+        print("4. 重新執行此腳本（加上 --force 可忽略指紋重新執行所有步驟）")
     
     print("\n📞 如需協助，請檢查錯誤訊息或重新執行設定腳本")
 
@@ -2,135 +2,394 @@ import time
 import re
 import os
 import json
+import functools
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from urllib.parse import urljoin
 import pytest
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 import requests
+from ui_backends import (
+    By,
+    DEFAULT_BACKEND,
+    DEFAULT_LOAD_PROFILE,
+    create_backend,
+    resolve_load_profile,
+)
+from change_detection import ChangeDetector
+from github_capture import (
+    CAPTURE_MODES,
+    DEFAULT_CAPTURE_DIR,
+    DEFAULT_CAPTURE_MODE,
+    SNAPSHOT_SCRIPT,
+    CaptureStore,
+    ReplayServer,
+)
+from selector_registry import PROBE_SCRIPT, SelectorRegistry
+from screenshot_pipeline import get_pipeline
+from ui_tracing import NAVIGATION_TIMING_SCRIPT, TracedBackend, current_tracer, trace_span, traced
 
-# 嘗試自動安裝 ChromeDriver（如失敗則改用 Selenium Manager）
-try:
-    import chromedriver_autoinstaller
-    try:
-        # 在某些環境（如公司代理或憑證問題）可能下載失敗
-        chromedriver_autoinstaller.install()
-    except Exception as autoinstall_error:
-        print(f"警告: chromedriver_autoinstaller 失敗，改用 Selenium 內建管理器。原因: {autoinstall_error}")
-except ImportError:
-    print("警告: chromedriver_autoinstaller 未安裝，將使用 Selenium 內建管理器")
+# 分析器各頁面元素的定位策略，依優先順序排列；最後一欄標示首選策略（彼此等價），其餘為資訊較少的備用策略。
+# SelectorRegistry 只會把上次成功的首選策略移到最前面，備用策略一律排在首選策略之後
+SELECTOR_STRATEGIES = {
+    "repo_home.contributors": [
+        # 連結可進入貢獻者頁面取得名單與頭像；側邊欄只有數量與部分名稱
+        ("contributors_link", By.XPATH, "//a[contains(@href, '/contributors')]", True),
+        ("sidebar_contributors", By.CSS_SELECTOR, "[data-testid='contributors'] a", False),
+    ],
+    "commits.commit_rows": [
+        ("commit_row_testid", By.CSS_SELECTOR, "[data-testid='commit-row']", True),
+        # .Box-row 也符合頁面上其他清單的列
+        ("commit_item_box_row", By.CSS_SELECTOR, ".commit-item, .Box-row", False),
+    ],
+}
+
+# 設為 0 時每次都完整操作瀏覽器，不沿用保存的分析結果（pytest 測試一律不沿用）
+DETECT_CHANGES = os.environ.get("UI_CHANGE_DETECTION", "1") != "0"
+CHANGE_TRACKED_RESULTS = ("contributors", "wireframe", "last_commit")
+
+
+# 各項檢查「沒有結果」的判斷；檢查本身會吞下例外並回傳空結果，需另外判斷才知道是否成功
+EMPTY_RESULT_CHECKS = {
+    "contributors": lambda result: not result["count"],
+    "wireframe": lambda result: not result["page_exists"],
+    "last_commit": lambda result: not result["author"],
+}
+
+
+def check_errors(results: Dict[str, Any]) -> Dict[str, str]:
+    """回傳失敗（發生例外）或沒有結果的檢查與原因"""
+    errors = {}
+    for key, is_empty in EMPTY_RESULT_CHECKS.items():
+        result = results.get(key)
+        if result is None:
+            continue
+        if result.get("error"):
+            errors[key] = result["error"]
+        elif is_empty(result):
+            errors[key] = "沒有取得結果"
+    return errors
+
+
+def reuse_when_unchanged(key: str):
+    """分析方法的裝飾器：儲存庫沒有變更時直接回傳保存的結果，否則執行並記錄結果"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            stored = self._stored_result(key)
+            if stored is not None:
+                return stored
+            result = func(self, *args, **kwargs)
+            self._remember_result(key, result)
+            return result
+        return wrapper
+    return decorator
 
 
 class GitHubUIClient:
     """GitHub UI 自動化測試客戶端"""
     
-    def __init__(self, headless: bool = True, timeout: int = 10):
+    def __init__(self, headless: bool = True, timeout: int = 10,
+                 load_profile: Union[str, Dict[str, Any]] = None, backend: str = None,
+                 capture_mode: str = None, capture_dir: str = None,
+                 selector_registry: SelectorRegistry = None, probe_timeout: float = 1.5,
+                 rate_limiter=None):
         self.timeout = timeout
-        self.driver = None
-        self.wait = None
+        self.rate_limiter = rate_limiter  # 批次爬取時多個客戶端共用的每主機請求間隔限制
+        self.probe_timeout = probe_timeout
+        self.selector_registry = selector_registry or SelectorRegistry()
+        self.backend = None
         self.screenshots_dir = "screenshots"
+        self.load_profile_name, self.load_profile = resolve_load_profile(
+            load_profile or DEFAULT_LOAD_PROFILE
+        )
+        self.backend_name = backend or DEFAULT_BACKEND
+        self.navigation_stats = []
+        self.capture_store = None
+        self.replay_server = None
         self._setup_directories()
+        self._setup_capture(capture_mode or DEFAULT_CAPTURE_MODE, capture_dir or DEFAULT_CAPTURE_DIR)
         self._setup_driver(headless)
     
+    @property
+    def driver(self):
+        """底層瀏覽器物件（Selenium WebDriver 或 Playwright Page）"""
+        return self.backend.driver if self.backend else None
+    
     def _setup_directories(self):
         """建立必要的目錄"""
         os.makedirs(self.screenshots_dir, exist_ok=True)
         os.makedirs("logs", exist_ok=True)
     
-    def _setup_driver(self, headless: bool):
-        """設定 Chrome WebDriver"""
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+    def _setup_capture(self, capture_mode: str, capture_dir: str):
+        """設定頁面錄製或重播"""
+        if capture_mode not in CAPTURE_MODES:
+            raise ValueError(f"未知的錄製模式: {capture_mode}，可用: {', '.join(CAPTURE_MODES)}")
+        
+        self.capture_mode = capture_mode
+        if capture_mode == "off":
+            return
+        
+        self.capture_store = CaptureStore(capture_dir)
+        if capture_mode == "replay":
+            if not len(self.capture_store):
+                print(f"警告: {capture_dir} 沒有錄製頁面，請先執行: python3 github_capture.py refresh")
+            self.replay_server = ReplayServer(self.capture_store).start()
+    
+    def _capture_current_page(self):
+        """錄製模式下保存目前頁面渲染後的 DOM"""
+        if self.capture_mode != "record":
+            return
         
         try:
-            # 嘗試自動偵測 ChromeDriver
-            self.driver = webdriver.Chrome(options=chrome_options)
+            self.capture_store.put(
+                self.backend.current_url(),
+                self.backend.execute_script(SNAPSHOT_SCRIPT),
+                self.backend.title(),
+            )
         except Exception as e:
-            print(f"ChromeDriver 設定失敗: {e}")
-            print("請確保已安裝 ChromeDriver 或使用 'pip install chromedriver-autoinstaller'")
-            raise
+            print(f"警告: 錄製頁面失敗: {e}")
+    
+    def settle(self, seconds: float):
+        """等待頁面動態內容載入，重播的靜態頁面不需要等待"""
+        if self.capture_mode != "replay":
+            with trace_span("settle", "wait", seconds=seconds):
+                time.sleep(seconds)
+    
+    def _setup_driver(self, headless: bool):
+        """建立並啟動瀏覽器後端"""
+        self.backend = TracedBackend(create_backend(self.backend_name, self.load_profile))
+        self.backend.start(headless)
+    
+    def _record_navigation_stats(self, url: str, summary: Dict[str, Any]):
+        """記錄單次導航被封鎖的請求數與估計節省的流量"""
+        summary.pop("blocked_urls", None)
+        summary["url"] = url
+        summary["profile"] = self.load_profile_name
+        self.navigation_stats.append(summary)
         
-        self.wait = WebDriverWait(self.driver, self.timeout)
+        if summary["requests_blocked"]:
+            print(f"資源封鎖 [{self.load_profile_name}] {url}: "
+                  f"封鎖 {summary['requests_blocked']} 個請求，"
+                  f"估計節省 {summary['bytes_saved_estimate'] // 1024} KB，"
+                  f"實際傳輸 {summary['bytes_transferred'] // 1024} KB")
+        return summary
     
-    def navigate_to(self, url: str):
-        """導航到指定 URL"""
+    def get_load_stats(self) -> Dict[str, Any]:
+        """彙總所有導航的資源封鎖統計"""
+        return {
+            "profile": self.load_profile_name,
+            "navigations": len(self.navigation_stats),
+            "requests_blocked": sum(s["requests_blocked"] for s in self.navigation_stats),
+            "bytes_saved_estimate": sum(s["bytes_saved_estimate"] for s in self.navigation_stats),
+            "bytes_transferred": sum(s["bytes_transferred"] for s in self.navigation_stats),
+        }
+    
+    def _trace_navigation(self, url: str):
+        """追蹤開啟時記錄本次導航的 Navigation/Resource Timing 與 DevTools 網路事件"""
+        tracer = current_tracer()
+        if tracer is None:
+            return
+        
         try:
-            self.driver.get(url)
-            time.sleep(2)  # 等待頁面完全載入
+            tracer.add_navigation_timing(url, json.loads(self.backend.execute_script(NAVIGATION_TIMING_SCRIPT)))
         except Exception as e:
-            print(f"導航到 {url} 失敗: {e}")
-            raise
+            print(f"警告: 無法取得導航時序: {e}")
+        tracer.add_devtools_log(self.backend.last_performance_log)
     
+    def navigate_to(self, url: str):
+        """導航到指定 URL"""
+        with trace_span("navigate_to", url=url):
+            try:
+                self.throttle(url)
+                self.backend.begin_navigation()
+                self.backend.get(self.replay_server.rewrite(url) if self.replay_server else url)
+                self.settle(2)  # 等待頁面完全載入
+                self._record_navigation_stats(url, self.backend.end_navigation())
+                self._trace_navigation(url)
+                self._capture_current_page()
+            except Exception as e:
+                print(f"導航到 {url} 失敗: {e}")
+                raise
+    
+    @traced("client")
     def find_element_safe(self, by: By, value: str, timeout: int = None) -> Optional[Any]:
         """安全地尋找元素，不拋出異常"""
-        try:
-            wait_time = timeout or self.timeout
-            element = WebDriverWait(self.driver, wait_time).until(
-                EC.presence_of_element_located((by, value))
-            )
-            return element
-        except TimeoutException:
-            return None
+        wait_time = timeout or self.timeout
+        element = self.backend.find_element(by, value, wait_time)
+        self._capture_current_page()
+        return element
     
+    @traced("client")
     def find_elements_safe(self, by: By, value: str) -> List[Any]:
         """安全地尋找多個元素"""
-        try:
-            return self.driver.find_elements(by, value)
-        except NoSuchElementException:
-            return []
+        elements = self.backend.find_elements(by, value)
+        self._capture_current_page()
+        return elements
+    
+    @traced("client")
+    def find_with_strategies(self, key: str, strategies: List[tuple], multiple: bool = False,
+                             timeout: int = None) -> tuple:
+        """
+        依策略清單尋找元素，回傳 (策略名稱, 元素或元素列表)，都找不到時回傳 (None, None 或 [])
+        
+        每次輪詢以一個腳本同時檢查所有策略：首選策略一出現就採用（上次成功的首選策略優先）；
+        備用策略只有在首選策略經過 probe_timeout 仍未出現時才採用，頁面仍在載入時不會先選到資訊較少的元素。
+        已升級的備用策略（改版後首選策略連續多次都沒出現）不再等待 probe_timeout
+        """
+        ordered = self.selector_registry.ordered(key, strategies)
+        winner = self.selector_registry.winner(key)
+        probes = [[by, value] for _, by, value, _ in ordered]
+        started = time.monotonic()
+        deadline = started + (timeout or self.timeout)
+        
+        while True:
+            try:
+                matches = self.backend.execute_script(PROBE_SCRIPT, probes) or []
+            except Exception as e:
+                print(f"選擇器探測失敗: {e}")
+                matches = []
+            
+            now = time.monotonic()
+            settled = now - started >= self.probe_timeout or now >= deadline
+            for (name, by, value, preferred), matched in zip(ordered, matches):
+                if not matched:
+                    continue
+                if not preferred and name != winner and not settled:
+                    continue
+                
+                found = self.find_elements_safe(by, value) if multiple else \
+                    self.find_element_safe(by, value, timeout=self.probe_timeout)
+                if found:
+                    self.selector_registry.record_hit(key, name, preferred)
+                    return name, found
+            
+            if now >= deadline:
+                self.selector_registry.record_miss(key)
+                return None, [] if multiple else None
+            time.sleep(0.2)
+    
+    def throttle(self, url: str):
+        """等待此主機的下一個可用時段（批次爬取時多個客戶端共用；重播模式不限制）"""
+        if self.rate_limiter and not self.replay_server:
+            with trace_span("rate_limit", "wait"):
+                self.rate_limiter.wait(url)
+    
+    def click_link(self, element):
+        """點擊元素；連結會導航到其他頁面，點擊前同樣遵守每主機的請求間隔"""
+        href = element.get_attribute("href")
+        if href:
+            self.throttle(href)
+        element.click()
     
+    @traced("client")
     def click_element_safe(self, by: By, value: str, timeout: int = None) -> bool:
         """安全地點擊元素"""
         try:
             element = self.find_element_safe(by, value, timeout)
             if element:
-                element.click()
-                time.sleep(1)
+                self.click_link(element)
+                self.settle(1)
                 return True
             return False
         except Exception as e:
             print(f"點擊元素失敗: {e}")
             return False
     
+    def get_title(self) -> str:
+        """取得頁面標題"""
+        return self.backend.title()
+    
     def get_page_source(self) -> str:
         """取得頁面原始碼"""
-        return self.driver.page_source
+        return self.backend.page_source()
     
-    def take_screenshot(self, filename: str = None) -> str:
-        """截圖並保存"""
+    def take_screenshot(self, filename: str = None, element: Any = None) -> str:
+        """
+        截圖並交由背景管線壓縮與保存，回傳檔案路徑
+        
+        指定 element 時只擷取該元素範圍；與既有截圖畫面相同時回傳既有檔案，不重複保存
+        """
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"screenshot_{timestamp}.png"
         
-        filepath = os.path.join(self.screenshots_dir, filename)
-        self.driver.save_screenshot(filepath)
-        return filepath
+        with trace_span("take_screenshot", cropped=element is not None):
+            png_bytes = element.screenshot_as_png if element is not None else self.backend.screenshot_png()
+        return get_pipeline(self.screenshots_dir).submit(png_bytes, filename)
     
     def close(self):
         """關閉瀏覽器"""
-        if self.driver:
-            self.driver.quit()
+        if self.backend:
+            self.backend.quit()
+        if self.capture_mode == "record":
+            self.capture_store.save()
+        if self.replay_server:
+            self.replay_server.stop()
+        try:
+            self.selector_registry.save()
+        except OSError as e:
+            print(f"警告: 無法保存選擇器策略快取: {e}")
 
 
 class HahowRecruitAnalyzer:
     """Hahow Recruit 專案分析器"""
     
-    def __init__(self, base_url: str = "https://github.com/hahow/hahow-recruit"):
+    def __init__(self, base_url: str = "https://github.com/hahow/hahow-recruit", backend: str = None,
+                 change_detector: ChangeDetector = None, detect_changes: bool = None, **client_options):
         self.base_url = base_url
-        self.client = GitHubUIClient(headless=True)
+        self.backend = backend
+        self.client_options = client_options
+        self._client = None
+        
+        # 錄製與重播模式必須實際操作瀏覽器，不做變更偵測
+        if detect_changes is None:
+            detect_changes = DETECT_CHANGES
+        capture_mode = client_options.get("capture_mode") or DEFAULT_CAPTURE_MODE
+        self.change_detector = None
+        if detect_changes and capture_mode == "off":
+            self.change_detector = change_detector or ChangeDetector()
+        self._reset_change_state()
+    
+    @property
+    def client(self) -> GitHubUIClient:
+        """瀏覽器客戶端，第一次需要操作頁面時才啟動"""
+        if self._client is None:
+            self._client = GitHubUIClient(headless=True, backend=self.backend, **self.client_options)
+        return self._client
+    
+    def _reset_change_state(self):
+        self._precheck = None  # (SHA, 保存的結果)
+        self._fresh_results = {}
+    
+    def _page_urls(self) -> List[str]:
+        """三項檢查會造訪的頁面"""
+        return [self.base_url, f"{self.base_url}/blob/master/frontend.md", f"{self.base_url}/commits"]
+    
+    def _stored_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """儲存庫沒有變更時回傳保存的結果（每個 base_url 只做一次預檢）"""
+        if self.change_detector is None:
+            return None
+        if self._precheck is None:
+            with trace_span("change_precheck", "analyzer"):
+                self._precheck = self.change_detector.check(self.base_url, self._page_urls())
+            sha, stored = self._precheck
+            if stored is not None:
+                print(f"{self.base_url} 在 {sha[:7]} 之後沒有變更，沿用保存的分析結果")
+        stored = self._precheck[1]
+        return stored.get(key) if stored else None
     
+    def _remember_result(self, key: str, result: Dict[str, Any]):
+        """三項檢查都完成時，以目前的 SHA 保存結果"""
+        sha = self._precheck[0] if self._precheck else None
+        if not sha or self._precheck[1] is not None:
+            return
+        self._fresh_results[key] = result
+        # 有檢查失敗或沒有結果時通常代表頁面沒有正常載入，不保存以免之後一直沿用錯誤結果
+        if set(self._fresh_results) >= set(CHANGE_TRACKED_RESULTS) and not check_errors(self._fresh_results):
+            self.change_detector.record(self.base_url, sha, dict(self._fresh_results), self._page_urls())
+    
+    @traced("analyzer")
+    @reuse_when_unchanged("contributors")
     def get_contributors_info(self) -> Dict[str, Any]:
         """獲取專案合作者資訊"""
         try:
@@ -143,12 +402,12 @@ class HahowRecruitAnalyzer:
                 "details": []
             }
             
-            # 方法1：尋找 Contributors 鏈接
-            contributors_link = self.client.find_element_safe(
-                By.XPATH, "//a[contains(@href, '/contributors')]"
+            # 方法1：尋找 Contributors 鏈接（方法2 的側邊欄選擇器同時探測，改版時不必等待逾時）
+            strategy, contributors_link = self.client.find_with_strategies(
+                "repo_home.contributors", SELECTOR_STRATEGIES["repo_home.contributors"]
             )
             
-            if contributors_link:
+            if strategy == "contributors_link":
                 contributors_text = contributors_link.text
                 # 解析貢獻者數量 (例如: "Contributors 3")
                 count_match = re.search(r'(\d+)', contributors_text)
@@ -156,8 +415,8 @@ class HahowRecruitAnalyzer:
                     contributors_info["count"] = int(count_match.group(1))
                 
                 # 點擊進入貢獻者頁面
-                contributors_link.click()
-                time.sleep(3)
+                self.client.click_link(contributors_link)
+                self.client.settle(3)
                 
                 # 獲取貢獻者名單
                 contributor_elements = self.client.find_elements_safe(
@@ -181,8 +440,9 @@ class HahowRecruitAnalyzer:
             
             # 方法2：如果找不到 Contributors 鏈接，嘗試其他方式
             if contributors_info["count"] == 0:
-                # 回到主頁面
-                self.client.navigate_to(self.base_url)
+                # 已點擊進入貢獻者頁面時回到主頁面
+                if strategy == "contributors_link":
+                    self.client.navigate_to(self.base_url)
                 
                 # 尋找側邊欄的貢獻者資訊
                 sidebar_contributors = self.client.find_elements_safe(
@@ -201,14 +461,16 @@ class HahowRecruitAnalyzer:
             
         except Exception as e:
             print(f"獲取貢獻者資訊時發生錯誤: {e}")
-            return {"count": 0, "names": [], "details": []}
+            return {"count": 0, "names": [], "details": [], "error": f"{type(e).__name__}: {e}"}
     
+    @traced("analyzer")
+    @reuse_when_unchanged("wireframe")
     def check_frontend_wireframe_image(self) -> Dict[str, Any]:
         """檢查 frontend.md 中的 Wireframe 圖片是否存在"""
         try:
             frontend_url = f"{self.base_url}/blob/master/frontend.md"
             self.client.navigate_to(frontend_url)
-            time.sleep(3)
+            self.client.settle(3)
             
             result = {
                 "page_exists": False,
@@ -218,7 +480,7 @@ class HahowRecruitAnalyzer:
             }
             
             # 檢查頁面是否存在
-            page_title = self.client.driver.title
+            page_title = self.client.get_title()
             if "404" not in page_title and "frontend.md" in page_title:
                 result["page_exists"] = True
             
@@ -259,36 +521,32 @@ class HahowRecruitAnalyzer:
                 "page_exists": False,
                 "wireframe_found": False,
                 "images_found": [],
-                "wireframe_images": []
+                "wireframe_images": [],
+                "error": f"{type(e).__name__}: {e}",
             }
     
+    @traced("analyzer")
+    @reuse_when_unchanged("last_commit")
     def get_last_commit_author(self) -> Dict[str, Any]:
         """獲取最後一個 commit 的作者資訊"""
+        result = {
+            "author": "",
+            "commit_message": "",
+            "commit_date": "",
+            "commit_hash": ""
+        }
         try:
             # 導航到 commits 頁面
             commits_url = f"{self.base_url}/commits"
             self.client.navigate_to(commits_url)
-            time.sleep(3)
-            
-            result = {
-                "author": "",
-                "commit_message": "",
-                "commit_date": "",
-                "commit_hash": ""
-            }
+            self.client.settle(3)
             
             # 尋找第一個（最新的）commit 資訊
             # GitHub 的 commit 列表通常使用特定的 CSS 選擇器
-            commit_elements = self.client.find_elements_safe(
-                By.CSS_SELECTOR, "[data-testid='commit-row']"
+            _, commit_elements = self.client.find_with_strategies(
+                "commits.commit_rows", SELECTOR_STRATEGIES["commits.commit_rows"], multiple=True
             )
             
-            if not commit_elements:
-                # 備用選擇器
-                commit_elements = self.client.find_elements_safe(
-                    By.CSS_SELECTOR, ".commit-item, .Box-row"
-                )
-            
             if commit_elements:
                 first_commit = commit_elements[0]
                 
@@ -327,7 +585,7 @@ class HahowRecruitAnalyzer:
             # 嘗試從主頁面獲取資訊
             try:
                 self.client.navigate_to(self.base_url)
-                time.sleep(2)
+                self.client.settle(2)
                 
                 # 在主頁面尋找最新 commit 資訊
                 latest_commit = self.client.find_element_safe(
@@ -339,30 +597,60 @@ class HahowRecruitAnalyzer:
                     if author_element:
                         result["author"] = author_element.text
                 
+                if not result["author"]:
+                    result["error"] = f"{type(e).__name__}: {e}"
                 return result
                 
             except Exception as inner_e:
                 print(f"從主頁面獲取 commit 資訊也失敗: {inner_e}")
+                result["error"] = f"{type(e).__name__}: {e}"
                 return result
     
+    def analyze(self, base_url: str = None) -> Dict[str, Any]:
+        """執行三項檢查；指定 base_url 時改為分析該儲存庫（批次爬取時同一個瀏覽器可依序分析多個儲存庫）"""
+        if base_url and base_url.rstrip("/") != self.base_url:
+            self.base_url = base_url.rstrip("/")
+            self._reset_change_state()
+        results = {
+            "contributors": self.get_contributors_info(),
+            "wireframe": self.check_frontend_wireframe_image(),
+            "last_commit": self.get_last_commit_author(),
+        }
+        results["errors"] = check_errors(results)
+        return results
+    
+    def take_screenshot(self, filename: str = None) -> Optional[str]:
+        """截圖；沿用保存結果而沒有啟動瀏覽器時不截圖"""
+        return self._client.take_screenshot(filename) if self._client else None
+    
     def close(self):
         """關閉客戶端"""
-        self.client.close()
+        if self._client is not None:
+            self._client.close()
 
 
 class TestHahowRecruitUI:
     """Hahow Recruit UI 自動化測試類別"""
     
     @pytest.fixture(scope="class")
-    def analyzer(self):
-        """測試用的分析器實例"""
-        analyzer = HahowRecruitAnalyzer()
+    def analyzer(self, analysis_results):
+        """測試用的分析器實例（不沿用保存的分析結果，每次都實際操作瀏覽器）"""
+        analyzer = HahowRecruitAnalyzer(detect_changes=False)
         yield analyzer
+        record_client_stats(analyzer, analysis_results)
         analyzer.close()
     
-    def test_contributors_count_and_names(self, analyzer):
+    @pytest.fixture
+    def client(self):
+        """獨立的 UI 客戶端（測試失敗時截圖外掛可在關閉前擷取畫面）"""
+        client = GitHubUIClient(headless=True)
+        yield client
+        client.close()
+    
+    def test_contributors_count_and_names(self, analyzer, analysis_results):
         """測試：統計專案合作者數量並列出名字"""
         contributors_info = analyzer.get_contributors_info()
+        analysis_results["contributors"] = contributors_info
         
         print(f"\n專案合作者資訊:")
         print(f"合作者數量: {contributors_info['count']}")
@@ -381,9 +669,10 @@ class TestHahowRecruitUI:
         assert isinstance(contributors_info['names'], list)
         assert len(contributors_info['names']) <= contributors_info['count'] or contributors_info['count'] == 0
     
-    def test_frontend_wireframe_image(self, analyzer):
+    def test_frontend_wireframe_image(self, analyzer, analysis_results):
         """測試：檢查 frontend.md 中 Wireframe 圖片是否存在"""
         wireframe_info = analyzer.check_frontend_wireframe_image()
+        analysis_results["wireframe"] = wireframe_info
         
         print(f"\nfrontend.md 頁面檢查結果:")
         print(f"頁面是否存在: {'是' if wireframe_info['page_exists'] else '否'}")
@@ -404,9 +693,10 @@ class TestHahowRecruitUI:
         assert isinstance(wireframe_info['wireframe_found'], bool)
         assert isinstance(wireframe_info['images_found'], list)
     
-    def test_last_commit_author(self, analyzer):
+    def test_last_commit_author(self, analyzer, analysis_results):
         """測試：找出最後一個 commit 的作者"""
         commit_info = analyzer.get_last_commit_author()
+        analysis_results["last_commit"] = commit_info
         
         print(f"\n最後一個 commit 資訊:")
         print(f"作者: {commit_info['author']}")
@@ -422,69 +712,94 @@ class TestHahowRecruitUI:
         # 至少應該有作者資訊
         # assert len(commit_info['author']) > 0  # 可能會因為存取限制而失敗
     
-    def test_website_accessibility(self):
+    def test_website_accessibility(self, client):
         """測試：網站可存取性"""
-        client = GitHubUIClient(headless=True)
+        client.navigate_to("https://github.com/hahow/hahow-recruit")
         
-        try:
-            client.navigate_to("https://github.com/hahow/hahow-recruit")
-            
-            # 檢查頁面標題
-            title = client.driver.title
-            assert "hahow-recruit" in title.lower()
-            
-            # 檢查是否為公開專案（不是404頁面）
-            assert "404" not in title
-            
-            print(f"\n網站可存取性測試通過")
-            print(f"頁面標題: {title}")
-            
-        finally:
-            client.close()
+        # 檢查頁面標題
+        title = client.get_title()
+        assert "hahow-recruit" in title.lower()
+        
+        # 檢查是否為公開專案（不是404頁面）
+        assert "404" not in title
+        
+        print(f"\n網站可存取性測試通過")
+        print(f"頁面標題: {title}")
 
 
-def main():
-    """主要執行函數"""
-    print("=== Hahow Recruit UI 自動化分析 ===")
-    
-    analyzer = HahowRecruitAnalyzer()
-    
-    try:
-        # 1. 分析合作者資訊
-        print("\n1. 分析專案合作者...")
-        contributors_info = analyzer.get_contributors_info()
-        print(f"找到 {contributors_info['count']} 位合作者:")
+def format_analysis_report(results: Dict[str, Any]) -> List[str]:
+    """將分析結果整理成報告文字（只包含已完成的項目）"""
+    lines = []
+    if "contributors" in results:
+        contributors_info = results["contributors"]
+        lines.append(f"1. 找到 {contributors_info['count']} 位合作者:")
         for i, name in enumerate(contributors_info['names'], 1):
-            print(f"  {i}. {name}")
-        
-        # 2. 檢查 frontend.md 的 Wireframe 圖片
-        print("\n2. 檢查 frontend.md 的 Wireframe 圖片...")
-        wireframe_info = analyzer.check_frontend_wireframe_image()
+            lines.append(f"  {i}. {name}")
+    
+    if "wireframe" in results:
+        wireframe_info = results["wireframe"]
         if wireframe_info['page_exists']:
             if wireframe_info['wireframe_found']:
-                print("✓ frontend.md 存在且找到 Wireframe 相關內容")
+                lines.append("2. ✓ frontend.md 存在且找到 Wireframe 相關內容")
                 if wireframe_info['wireframe_images']:
-                    print(f"  找到 {len(wireframe_info['wireframe_images'])} 個 Wireframe 圖片")
+                    lines.append(f"  找到 {len(wireframe_info['wireframe_images'])} 個 Wireframe 圖片")
             else:
-                print("⚠ frontend.md 存在但未找到 Wireframe 圖片")
+                lines.append("2. ⚠ frontend.md 存在但未找到 Wireframe 圖片")
         else:
-            print("✗ frontend.md 頁面不存在或無法存取")
-        
-        # 3. 找出最後一個 commit 的作者
-        print("\n3. 尋找最後一個 commit 的作者...")
-        commit_info = analyzer.get_last_commit_author()
+            lines.append("2. ✗ frontend.md 頁面不存在或無法存取")
+    
+    if "last_commit" in results:
+        commit_info = results["last_commit"]
         if commit_info['author']:
-            print(f"最後一個 commit 的作者是: {commit_info['author']}")
+            lines.append(f"3. 最後一個 commit 的作者是: {commit_info['author']}")
             if commit_info['commit_message']:
-                print(f"Commit 訊息: {commit_info['commit_message'][:50]}...")
+                lines.append(f"  Commit 訊息: {commit_info['commit_message'][:50]}...")
         else:
-            print("無法獲取最後一個 commit 的作者資訊")
+            lines.append("3. 無法獲取最後一個 commit 的作者資訊")
+    
+    if results.get("errors"):
+        lines.append("未完成的檢查: " + "、".join(f"{key}（{message}）" for key, message in results["errors"].items()))
+    
+    if "load_stats" in results:
+        load_stats = results["load_stats"]
+        lines.append(f"資源載入設定檔: {load_stats['profile']}，"
+                     f"{load_stats['navigations']} 次導航共封鎖 {load_stats['requests_blocked']} 個請求，"
+                     f"估計節省 {load_stats['bytes_saved_estimate'] // 1024} KB")
+    
+    if results.get("selector_stats"):
+        lines.append("選擇器策略命中統計:")
+        for key, stats in results["selector_stats"].items():
+            lines.append(f"  {key}: 使用 {stats['winner']}，首選命中 {stats['first_choice_hits']} 次，"
+                         f"備用命中 {stats['fallback_hits']} 次，未命中 {stats['misses']} 次")
+    return lines
+
+
+def record_client_stats(analyzer: HahowRecruitAnalyzer, results: Dict[str, Any]):
+    """保存瀏覽器載入與選擇器命中統計（需在關閉分析器前呼叫；沿用保存結果而沒有啟動瀏覽器時略過）"""
+    if analyzer._client is None:
+        return
+    results["load_stats"] = analyzer.client.get_load_stats()
+    results["selector_stats"] = analyzer.client.selector_registry.stats()
+
+
+def main():
+    """主要執行函數"""
+    print("=== Hahow Recruit UI 自動化分析 ===")
+    
+    analyzer = HahowRecruitAnalyzer()
+    results = {}
+    
+    try:
+        results.update(analyzer.analyze())
+        record_client_stats(analyzer, results)
     
     except Exception as e:
         print(f"執行過程中發生錯誤: {e}")
     
     finally:
         analyzer.close()
+    
+    print("\n".join(format_analysis_report(results)))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,653 @@
+"""
+GitHub UI 自動化瀏覽器後端
+GitHubUIClient 透過相同介面操作 Selenium（同步 WebDriver）或 Playwright（非同步 API）
+"""
+
+import asyncio
+import fnmatch
+import json
+import os
+import threading
+from typing import List, Dict, Any, Optional
+
+from driver_resolver import resolve_chromedriver
+
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+WINDOW_SIZE = (1920, 1080)
+
+# 頁面載入設定檔：UI 檢查只讀取 DOM 文字與屬性，不需要下載圖片、字型或追蹤腳本
+# block_images 封鎖圖片下載，<img> 的 src 屬性仍會保留在 DOM 中
+# blocked_url_patterns 在請求發出前攔截（Selenium 使用 DevTools，Playwright 使用 route）
+LOAD_PROFILES = {
+    "full": {
+        "block_images": False,
+        "blocked_url_patterns": [],
+    },
+    "lite": {
+        "block_images": True,
+        "blocked_url_patterns": [
+            "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+            "*.woff", "*.woff2", "*.ttf", "*.otf",
+            "*.mp4", "*.webm",
+            "*avatars.githubusercontent.com/*",
+            "*collector.github.com/*",
+            "*api.github.com/_private/browser/*",
+            "*google-analytics.com/*",
+            "*googletagmanager.com/*",
+        ],
+    },
+    "minimal": {
+        "block_images": True,
+        "blocked_url_patterns": [
+            "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+            "*.woff", "*.woff2", "*.ttf", "*.otf",
+            "*.mp4", "*.webm",
+            "*.css",
+            "*avatars.githubusercontent.com/*",
+            "*collector.github.com/*",
+            "*api.github.com/_private/browser/*",
+            "*google-analytics.com/*",
+            "*googletagmanager.com/*",
+        ],
+    },
+}
+
+DEFAULT_LOAD_PROFILE = os.environ.get("UI_LOAD_PROFILE", "lite")
+DEFAULT_BACKEND = os.environ.get("UI_BACKEND", "selenium")
+
+# 被封鎖的請求沒有實際大小，依資源類型估算節省的位元組數
+RESOURCE_SIZE_ESTIMATES = {
+    "Image": 20 * 1024,
+    "Font": 40 * 1024,
+    "Stylesheet": 60 * 1024,
+    "Script": 80 * 1024,
+    "Media": 500 * 1024,
+    "Other": 5 * 1024,
+}
+
+# Playwright 的 resource_type 對應到 Chrome DevTools 的資源類型名稱
+PLAYWRIGHT_RESOURCE_TYPES = {
+    "document": "Document",
+    "image": "Image",
+    "font": "Font",
+    "stylesheet": "Stylesheet",
+    "script": "Script",
+    "media": "Media",
+}
+
+
+class By:
+    """與 selenium.webdriver.common.by.By 相同的定位方式，匯入時不需要載入 selenium"""
+    
+    ID = "id"
+    XPATH = "xpath"
+    LINK_TEXT = "link text"
+    PARTIAL_LINK_TEXT = "partial link text"
+    NAME = "name"
+    TAG_NAME = "tag name"
+    CLASS_NAME = "class name"
+    CSS_SELECTOR = "css selector"
+
+
+class ElementNotFoundError(Exception):
+    """在元素範圍內找不到子元素"""
+
+
+def resolve_load_profile(load_profile) -> tuple:
+    """解析載入設定檔名稱或自訂設定"""
+    if isinstance(load_profile, dict):
+        profile = dict(LOAD_PROFILES["full"])
+        profile.update(load_profile)
+        return "custom", profile
+    
+    if load_profile not in LOAD_PROFILES:
+        raise ValueError(f"未知的載入設定檔: {load_profile}，可用: {', '.join(LOAD_PROFILES)}")
+    return load_profile, LOAD_PROFILES[load_profile]
+
+
+def new_navigation_summary() -> Dict[str, Any]:
+    """建立單次導航的統計資料結構"""
+    return {
+        "requests": 0,
+        "requests_blocked": 0,
+        "bytes_transferred": 0,
+        "bytes_saved_estimate": 0,
+        "blocked_by_type": {},
+        "blocked_urls": [],
+    }
+
+
+def count_blocked_request(summary: Dict[str, Any], resource_type: str, url: str = ""):
+    """將一個被封鎖的請求計入統計"""
+    summary["requests_blocked"] += 1
+    summary["blocked_by_type"][resource_type] = summary["blocked_by_type"].get(resource_type, 0) + 1
+    summary["bytes_saved_estimate"] += RESOURCE_SIZE_ESTIMATES.get(
+        resource_type, RESOURCE_SIZE_ESTIMATES["Other"]
+    )
+    if url:
+        summary["blocked_urls"].append(url)
+
+
+def summarize_network_log(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """彙整 Chrome performance log 中的網路事件"""
+    summary = new_navigation_summary()
+    request_types = {}
+    request_urls = {}
+    
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        
+        method = message.get("method")
+        params = message.get("params", {})
+        
+        if method == "Network.requestWillBeSent":
+            request_id = params.get("requestId")
+            if request_id not in request_types:
+                summary["requests"] += 1
+            request_types[request_id] = params.get("type", "Other")
+            request_urls[request_id] = params.get("request", {}).get("url", "")
+        elif method == "Network.loadingFinished":
+            summary["bytes_transferred"] += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            request_id = params.get("requestId")
+            count_blocked_request(
+                summary,
+                params.get("type") or request_types.get(request_id, "Other"),
+                request_urls.get(request_id, ""),
+            )
+    
+    return summary
+
+
+class BrowserBackend:
+    """瀏覽器後端介面，元素以 Selenium 的 (By, value) 形式定位"""
+    
+    name = ""
+    
+    def __init__(self, load_profile: Dict[str, Any]):
+        self.load_profile = load_profile
+        self.last_performance_log = []
+    
+    @property
+    def driver(self):
+        """底層原生物件（WebDriver 或 Playwright Page）"""
+        raise NotImplementedError
+    
+    def start(self, headless: bool):
+        raise NotImplementedError
+    
+    def get(self, url: str):
+        raise NotImplementedError
+    
+    def current_url(self) -> str:
+        raise NotImplementedError
+    
+    def title(self) -> str:
+        raise NotImplementedError
+    
+    def page_source(self) -> str:
+        raise NotImplementedError
+    
+    def find_element(self, by: str, value: str, timeout: float) -> Optional[Any]:
+        """等待元素出現，逾時回傳 None"""
+        raise NotImplementedError
+    
+    def find_elements(self, by: str, value: str) -> List[Any]:
+        raise NotImplementedError
+    
+    def execute_script(self, script: str, *args):
+        raise NotImplementedError
+    
+    def screenshot_png(self) -> bytes:
+        """擷取目前視窗的 PNG 原始資料"""
+        raise NotImplementedError
+    
+    def begin_navigation(self):
+        """導航前重置統計"""
+    
+    def end_navigation(self) -> Dict[str, Any]:
+        """導航後回傳本次的資源封鎖統計"""
+        return new_navigation_summary()
+    
+    def quit(self):
+        raise NotImplementedError
+
+
+class SeleniumBackend(BrowserBackend):
+    """Selenium 同步 Chrome WebDriver 後端"""
+    
+    name = "selenium"
+    
+    def __init__(self, load_profile: Dict[str, Any]):
+        super().__init__(load_profile)
+        self._driver = None
+    
+    @property
+    def driver(self):
+        return self._driver
+    
+    def start(self, headless: bool):
+        """設定 Chrome WebDriver"""
+        # selenium 在第一次啟動瀏覽器時才載入，匯入模組與 pytest 收集測試不受影響
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+        
+        chrome_options = Options()
+        if headless:
+            chrome_options.add_argument('--headless')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument(f'--window-size={WINDOW_SIZE[0]},{WINDOW_SIZE[1]}')
+        chrome_options.add_argument(f'--user-agent={USER_AGENT}')
+        
+        # 封鎖圖片下載（DOM 中的 src 屬性不受影響）
+        if self.load_profile["block_images"]:
+            chrome_options.add_experimental_option(
+                "prefs", {"profile.managed_default_content_settings.images": 2}
+            )
+        # 開啟 performance log 以統計每次導航的請求與流量
+        chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        
+        driver_path = resolve_chromedriver()
+        service = Service(executable_path=driver_path) if driver_path else Service()
+        
+        try:
+            self._driver = webdriver.Chrome(service=service, options=chrome_options)
+        except Exception as e:
+            print(f"ChromeDriver 設定失敗: {e}")
+            print("請確保已安裝 ChromeDriver 或使用 'pip install chromedriver-autoinstaller'")
+            raise
+        
+        self._apply_request_blocking()
+    
+    def _apply_request_blocking(self):
+        """透過 DevTools 攔截符合 URL 樣式的請求"""
+        from selenium.common.exceptions import WebDriverException
+        
+        patterns = self.load_profile["blocked_url_patterns"]
+        if not patterns:
+            return
+        
+        try:
+            self._driver.execute_cdp_cmd("Network.enable", {})
+            self._driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        except WebDriverException as e:
+            print(f"警告: 無法設定請求攔截，將載入完整頁面資源。原因: {e}")
+    
+    def _drain_performance_log(self) -> List[Dict[str, Any]]:
+        """取出並清空目前累積的 performance log"""
+        from selenium.common.exceptions import WebDriverException
+        
+        try:
+            return self._driver.get_log("performance")
+        except WebDriverException:
+            return []
+    
+    def _count_suppressed_images(self, blocked_urls: set) -> int:
+        """計算被偏好設定封鎖下載、但仍保留 src 的圖片數量"""
+        from selenium.common.exceptions import WebDriverException
+        
+        if not self.load_profile["block_images"]:
+            return 0
+        
+        try:
+            sources = self._driver.execute_script(
+                "return Array.from(document.images)"
+                ".filter(img => img.src && !img.src.startsWith('data:') && img.naturalWidth === 0)"
+                ".map(img => img.src);"
+            ) or []
+        except WebDriverException:
+            return 0
+        return len(set(sources) - blocked_urls)
+    
+    def begin_navigation(self):
+        self._drain_performance_log()  # 捨棄上一頁殘留的事件
+    
+    def end_navigation(self) -> Dict[str, Any]:
+        self.last_performance_log = self._drain_performance_log()
+        summary = summarize_network_log(self.last_performance_log)
+        for _ in range(self._count_suppressed_images(set(summary["blocked_urls"]))):
+            count_blocked_request(summary, "Image")
+        return summary
+    
+    def get(self, url: str):
+        self._driver.get(url)
+    
+    def current_url(self) -> str:
+        return self._driver.current_url
+    
+    def title(self) -> str:
+        return self._driver.title
+    
+    def page_source(self) -> str:
+        return self._driver.page_source
+    
+    def find_element(self, by: str, value: str, timeout: float) -> Optional[Any]:
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+        
+        try:
+            return WebDriverWait(self._driver, timeout).until(
+                EC.presence_of_element_located((by, value))
+            )
+        except TimeoutException:
+            return None
+    
+    def find_elements(self, by: str, value: str) -> List[Any]:
+        from selenium.common.exceptions import NoSuchElementException
+        
+        try:
+            return self._driver.find_elements(by, value)
+        except NoSuchElementException:
+            return []
+    
+    def execute_script(self, script: str, *args):
+        return self._driver.execute_script(script, *args)
+    
+    def screenshot_png(self) -> bytes:
+        return self._driver.get_screenshot_as_png()
+    
+    def quit(self):
+        if self._driver:
+            self._driver.quit()
+            self._driver = None
+
+
+def to_playwright_selector(by: str, value: str) -> str:
+    """將 Selenium 的 (By, value) 轉為 Playwright 選擇器"""
+    if by == "xpath":
+        return f"xpath={value}"
+    if by in ("css selector", "tag name"):
+        return f"css={value}"
+    if by == "id":
+        return f"css=#{value}"
+    if by == "class name":
+        return f"css=.{value}"
+    if by == "name":
+        return f'css=[name="{value}"]'
+    if by == "link text":
+        return f"text={value}"
+    raise ValueError(f"Playwright 後端不支援的定位方式: {by}")
+
+
+# 取得屬性時與 Selenium 相同：優先回傳 DOM property（href/src 會是完整網址），否則回傳 attribute
+_GET_ATTRIBUTE_SCRIPT = """(el, name) => {
+    const value = el[name];
+    if (typeof value === 'string' || typeof value === 'number' || typeof value === 'boolean') {
+        return String(value);
+    }
+    return el.getAttribute(name);
+}"""
+
+
+class _EventLoopThread:
+    """在背景執行緒上運行的 asyncio 事件迴圈，讓同步呼叫端驅動非同步 API"""
+    
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="playwright-loop", daemon=True)
+        self.thread.start()
+    
+    def run(self, coro):
+        """在事件迴圈上執行 coroutine 並等待結果"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+    
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+class PlaywrightBrowserPool:
+    """多個 browser context 共用同一個 Chromium 行程"""
+    
+    _lock = threading.Lock()
+    _runner = None
+    _playwright = None
+    _browsers = {}
+    _contexts = 0
+    
+    @classmethod
+    def acquire(cls, headless: bool):
+        """取得共用的瀏覽器，並回傳驅動它的事件迴圈"""
+        with cls._lock:
+            if cls._runner is None:
+                cls._runner = _EventLoopThread()
+            if cls._playwright is None:
+                cls._playwright = cls._runner.run(cls._start_playwright())
+            if headless not in cls._browsers:
+                cls._browsers[headless] = cls._runner.run(
+                    cls._playwright.chromium.launch(
+                        headless=headless,
+                        args=['--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu'],
+                    )
+                )
+            cls._contexts += 1
+            return cls._runner, cls._browsers[headless]
+    
+    @staticmethod
+    async def _start_playwright():
+        try:
+            from playwright.async_api import async_playwright
+        except ImportError:
+            raise ImportError("Playwright 後端需要 playwright 套件，請執行: "
+                              "pip install playwright && playwright install chromium")
+        return await async_playwright().start()
+    
+    @classmethod
+    def release(cls):
+        """最後一個 context 關閉時一併關閉瀏覽器與事件迴圈"""
+        with cls._lock:
+            cls._contexts -= 1
+            if cls._contexts > 0:
+                return
+            
+            for browser in cls._browsers.values():
+                cls._runner.run(browser.close())
+            cls._browsers = {}
+            if cls._playwright is not None:
+                cls._runner.run(cls._playwright.stop())
+                cls._playwright = None
+            cls._runner.stop()
+            cls._runner = None
+
+
+class PlaywrightElement:
+    """以 Selenium WebElement 介面包裝 Playwright ElementHandle"""
+    
+    def __init__(self, handle, runner: _EventLoopThread):
+        self._handle = handle
+        self._runner = runner
+    
+    @property
+    def text(self) -> str:
+        return self._runner.run(self._handle.inner_text())
+    
+    def get_attribute(self, name: str) -> Optional[str]:
+        return self._runner.run(self._handle.evaluate(_GET_ATTRIBUTE_SCRIPT, name))
+    
+    def click(self):
+        self._runner.run(self._handle.click())
+    
+    def find_element(self, by: str, value: str) -> "PlaywrightElement":
+        handle = self._runner.run(self._handle.query_selector(to_playwright_selector(by, value)))
+        if handle is None:
+            raise ElementNotFoundError(f"找不到元素: {by}={value}")
+        return PlaywrightElement(handle, self._runner)
+    
+    def find_elements(self, by: str, value: str) -> List["PlaywrightElement"]:
+        handles = self._runner.run(self._handle.query_selector_all(to_playwright_selector(by, value)))
+        return [PlaywrightElement(handle, self._runner) for handle in handles]
+    
+    @property
+    def screenshot_as_png(self) -> bytes:
+        return self._runner.run(self._handle.screenshot())
+
+
+class PlaywrightBackend(BrowserBackend):
+    """Playwright 非同步 API 後端，每個客戶端是共用瀏覽器中獨立的 browser context"""
+    
+    name = "playwright"
+    
+    def __init__(self, load_profile: Dict[str, Any]):
+        super().__init__(load_profile)
+        self._runner = None
+        self._context = None
+        self._page = None
+        self._summary = new_navigation_summary()
+    
+    @property
+    def driver(self):
+        return self._page
+    
+    def start(self, headless: bool):
+        self._runner, browser = PlaywrightBrowserPool.acquire(headless)
+        try:
+            self._runner.run(self._open_context(browser))
+        except Exception:
+            PlaywrightBrowserPool.release()
+            raise
+    
+    async def _open_context(self, browser):
+        self._context = await browser.new_context(
+            user_agent=USER_AGENT,
+            viewport={"width": WINDOW_SIZE[0], "height": WINDOW_SIZE[1]},
+        )
+        if self.load_profile["block_images"] or self.load_profile["blocked_url_patterns"]:
+            await self._context.route("**/*", self._route_request)
+        self._context.on("request", self._on_request)
+        self._context.on("response", self._on_response)
+        self._page = await self._context.new_page()
+    
+    def _is_blocked(self, resource_type: str, url: str) -> bool:
+        if self.load_profile["block_images"] and resource_type == "image":
+            return True
+        return any(fnmatch.fnmatch(url, pattern) for pattern in self.load_profile["blocked_url_patterns"])
+    
+    async def _route_request(self, route):
+        request = route.request
+        if self._is_blocked(request.resource_type, request.url):
+            count_blocked_request(
+                self._summary,
+                PLAYWRIGHT_RESOURCE_TYPES.get(request.resource_type, "Other"),
+                request.url,
+            )
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+    
+    def _on_request(self, request):
+        self._summary["requests"] += 1
+    
+    def _on_response(self, response):
+        try:
+            self._summary["bytes_transferred"] += int(response.headers.get("content-length", 0))
+        except ValueError:
+            pass
+    
+    def begin_navigation(self):
+        self._summary = new_navigation_summary()
+    
+    def end_navigation(self) -> Dict[str, Any]:
+        return self._summary
+    
+    def get(self, url: str):
+        self._runner.run(self._page.goto(url, wait_until="load"))
+    
+    def current_url(self) -> str:
+        return self._page.url
+    
+    def title(self) -> str:
+        return self._runner.run(self._page.title())
+    
+    def page_source(self) -> str:
+        return self._runner.run(self._page.content())
+    
+    def find_element(self, by: str, value: str, timeout: float) -> Optional[PlaywrightElement]:
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+        
+        try:
+            handle = self._runner.run(self._page.wait_for_selector(
+                to_playwright_selector(by, value), state="attached", timeout=timeout * 1000
+            ))
+        except PlaywrightTimeoutError:
+            return None
+        return PlaywrightElement(handle, self._runner) if handle else None
+    
+    def find_elements(self, by: str, value: str) -> List[PlaywrightElement]:
+        handles = self._runner.run(self._page.query_selector_all(to_playwright_selector(by, value)))
+        return [PlaywrightElement(handle, self._runner) for handle in handles]
+    
+    def execute_script(self, script: str, *args):
+        # Selenium 腳本以 return 回傳並透過 arguments 取得參數，包成函式以維持相同寫法
+        return self._runner.run(self._page.evaluate(
+            f"(args) => (function() {{ {script} }}).apply(null, args)", list(args)
+        ))
+    
+    def screenshot_png(self) -> bytes:
+        return self._runner.run(self._page.screenshot())
+    
+    def quit(self):
+        if self._context is None:
+            return
+        try:
+            self._runner.run(self._context.close())
+        finally:
+            self._context = None
+            self._page = None
+            PlaywrightBrowserPool.release()
+
+
+BACKENDS = {
+    SeleniumBackend.name: SeleniumBackend,
+    PlaywrightBackend.name: PlaywrightBackend,
+}
+
+
+def create_backend(name: str, load_profile: Dict[str, Any]) -> BrowserBackend:
+    """依名稱建立瀏覽器後端"""
+    if name not in BACKENDS:
+        raise ValueError(f"未知的瀏覽器後端: {name}，可用: {', '.join(BACKENDS)}")
+    return BACKENDS[name](load_profile)
+
+
+class TestUIBackends:
+    """瀏覽器後端工具測試"""
+    
+    def test_network_log_summary(self):
+        """測試：資源封鎖統計的 performance log 解析"""
+        def event(method, **params):
+            return {"message": json.dumps({"message": {"method": method, "params": params}})}
+        
+        entries = [
+            event("Network.requestWillBeSent", requestId="1", type="Document",
+                  request={"url": "https://github.com/hahow/hahow-recruit"}),
+            event("Network.loadingFinished", requestId="1", encodedDataLength=4096),
+            event("Network.requestWillBeSent", requestId="2", type="Image",
+                  request={"url": "https://avatars.githubusercontent.com/u/1"}),
+            event("Network.loadingFailed", requestId="2", type="Image", blockedReason="inspector"),
+            {"message": "not json"},
+        ]
+        
+        summary = summarize_network_log(entries)
+        
+        assert summary["requests"] == 2
+        assert summary["requests_blocked"] == 1
+        assert summary["blocked_by_type"] == {"Image": 1}
+        assert summary["blocked_urls"] == ["https://avatars.githubusercontent.com/u/1"]
+        assert summary["bytes_transferred"] == 4096
+        assert summary["bytes_saved_estimate"] == RESOURCE_SIZE_ESTIMATES["Image"]
+    
+    def test_playwright_selector_translation(self):
+        """測試：分析器使用的 Selenium 定位方式可轉換為 Playwright 選擇器"""
+        assert to_playwright_selector(By.XPATH, "//a[contains(@href, '/contributors')]") == \
+            "xpath=//a[contains(@href, '/contributors')]"
+        assert to_playwright_selector(By.CSS_SELECTOR, ".commit-item, .Box-row") == "css=.commit-item, .Box-row"
+        assert to_playwright_selector(By.TAG_NAME, "img") == "css=img"
@@ -0,0 +1,322 @@
+"""
+UI 自動化效能追蹤
+記錄導航時序（Navigation/Resource Timing、Chrome performance log）、WebDriver 指令與分析步驟，
+每個測試輸出一份 Chrome trace-event 格式的時間軸（可用 chrome://tracing 或 Perfetto 開啟），
+並在 HTML 報告加入摘要表格
+"""
+
+import functools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional
+
+import pytest
+
+TRACE_DIR = os.path.join("reports", "traces")
+
+# 取得目前頁面的 Navigation Timing 與 Resource Timing（時間皆相對於 timeOrigin，單位毫秒）
+NAVIGATION_TIMING_SCRIPT = """
+return JSON.stringify({
+    timeOrigin: performance.timeOrigin,
+    navigation: performance.getEntriesByType('navigation')[0] || null,
+    resources: performance.getEntriesByType('resource')
+});
+"""
+
+# Navigation Timing 各階段: (名稱, 開始欄位, 結束欄位)
+NAVIGATION_PHASES = [
+    ("dns", "domainLookupStart", "domainLookupEnd"),
+    ("connect", "connectStart", "connectEnd"),
+    ("ttfb", "requestStart", "responseStart"),
+    ("download", "responseStart", "responseEnd"),
+    ("dom_processing", "responseEnd", "domContentLoadedEventEnd"),
+    ("load_event", "domContentLoadedEventEnd", "loadEventEnd"),
+]
+
+SUMMARY_COLUMNS = [
+    ("navigations", "導航次數"),
+    ("dns", "DNS (ms)"),
+    ("connect", "連線 (ms)"),
+    ("ttfb", "TTFB (ms)"),
+    ("dom_processing", "DOM 處理 (ms)"),
+    ("resources", "資源數"),
+    ("wait", "固定等待 (ms)"),
+    ("webdriver", "WebDriver 指令 (ms)"),
+    ("webdriver_calls", "指令數"),
+    ("total", "測試總時間 (ms)"),
+]
+
+_active = {"tracer": None}
+
+
+def _now_us() -> float:
+    return time.time() * 1_000_000
+
+
+class Tracer:
+    """收集單一測試的 trace 事件"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.events = []
+        self.started_us = _now_us()
+        self.finished_us = None
+        self._lock = threading.Lock()
+        self._thread_ids = {}
+    
+    def _tid(self) -> int:
+        ident = threading.get_ident()
+        with self._lock:
+            return self._thread_ids.setdefault(ident, len(self._thread_ids) + 1)
+    
+    def add_complete(self, name: str, category: str, start_us: float, duration_us: float,
+                     tid: int = None, **args):
+        """加入一個完整事件（trace-event 的 "X" 類型）"""
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start_us,
+            "dur": max(0.0, duration_us),
+            "pid": 1,
+            "tid": tid if tid is not None else self._tid(),
+            "args": args,
+        })
+    
+    @contextmanager
+    def span(self, name: str, category: str, **args):
+        start_us = _now_us()
+        try:
+            yield
+        finally:
+            self.add_complete(name, category, start_us, _now_us() - start_us, **args)
+    
+    def add_navigation_timing(self, url: str, timing: Dict[str, Any]):
+        """將 Navigation/Resource Timing 轉為時間軸事件（獨立的 tid 方便閱讀）"""
+        origin_us = timing.get("timeOrigin", 0) * 1000
+        navigation = timing.get("navigation")
+        if navigation:
+            for phase, start_field, end_field in NAVIGATION_PHASES:
+                start, end = navigation.get(start_field, 0), navigation.get(end_field, 0)
+                if end and end >= start:
+                    self.add_complete(phase, "navigation", origin_us + start * 1000, (end - start) * 1000,
+                                      tid=100, url=url)
+        
+        for resource in timing.get("resources", []):
+            self.add_complete(
+                resource.get("name", "")[-120:], "resource",
+                origin_us + resource.get("startTime", 0) * 1000, resource.get("duration", 0) * 1000,
+                tid=101, initiator=resource.get("initiatorType"), transfer_size=resource.get("transferSize"),
+            )
+    
+    def add_devtools_log(self, entries: List[Dict[str, Any]]):
+        """將 Chrome performance log 的網路請求轉為時間軸事件"""
+        requests = {}
+        for entry in entries:
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+            timestamp_us = entry.get("timestamp", 0) * 1000
+            method = message.get("method")
+            if method == "Network.requestWillBeSent":
+                requests[request_id] = (timestamp_us, params.get("request", {}).get("url", ""), params.get("type"))
+            elif method in ("Network.loadingFinished", "Network.loadingFailed") and request_id in requests:
+                start_us, url, resource_type = requests.pop(request_id)
+                self.add_complete(url[-120:], "devtools", start_us, timestamp_us - start_us, tid=102,
+                                  type=resource_type, failed=method == "Network.loadingFailed",
+                                  blocked=params.get("blockedReason"))
+    
+    def finish(self):
+        self.finished_us = _now_us()
+    
+    def summary(self) -> Dict[str, float]:
+        """彙總各類別耗時（毫秒）"""
+        result = {key: 0 for key, _ in SUMMARY_COLUMNS}
+        for event in self.events:
+            duration_ms = event["dur"] / 1000
+            if event["cat"] == "navigation":
+                if event["name"] in result:
+                    result[event["name"]] += duration_ms
+            elif event["cat"] == "resource":
+                result["resources"] += 1
+            elif event["cat"] == "wait":
+                result["wait"] += duration_ms
+            elif event["cat"] == "webdriver":
+                result["webdriver"] += duration_ms
+                result["webdriver_calls"] += 1
+            elif event["cat"] == "client" and event["name"] == "navigate_to":
+                result["navigations"] += 1
+        result["total"] = ((self.finished_us or _now_us()) - self.started_us) / 1000
+        return {key: round(value, 1) for key, value in result.items()}
+    
+    def export(self, directory: str = TRACE_DIR) -> str:
+        """寫出 Chrome trace-event 格式的 JSON 檔"""
+        os.makedirs(directory, exist_ok=True)
+        filename = re.sub(r'[^\w.-]+', '_', self.name).strip('_') + ".json"
+        filepath = os.path.join(directory, filename)
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump({
+                "traceEvents": [
+                    {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": label}}
+                    for tid, label in ((100, "navigation timing"), (101, "resource timing"), (102, "devtools network"))
+                ] + sorted(self.events, key=lambda event: event["ts"]),
+                "displayTimeUnit": "ms",
+                "otherData": {"test": self.name},
+            }, f)
+        return filepath
+
+
+def current_tracer() -> Optional[Tracer]:
+    return _active["tracer"]
+
+
+def start_trace(name: str) -> Tracer:
+    _active["tracer"] = Tracer(name)
+    return _active["tracer"]
+
+
+def stop_trace() -> Optional[Tracer]:
+    tracer, _active["tracer"] = _active["tracer"], None
+    if tracer:
+        tracer.finish()
+    return tracer
+
+
+@contextmanager
+def trace_span(name: str, category: str = "client", **args):
+    """追蹤開啟時記錄區段耗時，否則不做任何事"""
+    tracer = current_tracer()
+    if tracer is None:
+        yield
+        return
+    with tracer.span(name, category, **args):
+        yield
+
+
+def traced(category: str):
+    """以函式名稱記錄呼叫耗時的裝飾器"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace_span(func.__name__, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracedBackend:
+    """記錄每個瀏覽器後端指令耗時的代理"""
+    
+    def __init__(self, backend):
+        self._backend = backend
+    
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        
+        @functools.wraps(attr)
+        def wrapper(*args, **kwargs):
+            with trace_span(name, "webdriver"):
+                return attr(*args, **kwargs)
+        return wrapper
+
+
+class TestUITracing:
+    """UI 效能追蹤測試"""
+    
+    def test_navigation_trace_export(self, tmp_path):
+        """測試：導航時序轉為 Chrome trace-event 時間軸與摘要"""
+        tracer = Tracer("ui_automation.py::test_example")
+        with tracer.span("navigate_to", "client"):
+            tracer.add_navigation_timing("https://github.com/hahow/hahow-recruit", {
+                "timeOrigin": 1_700_000_000_000.0,
+                "navigation": {"domainLookupStart": 1, "domainLookupEnd": 11, "requestStart": 20,
+                               "responseStart": 120, "responseEnd": 150, "domContentLoadedEventEnd": 400},
+                "resources": [{"name": "https://github.githubassets.com/app.js", "startTime": 160, "duration": 50}],
+            })
+        tracer.finish()
+        
+        summary = tracer.summary()
+        assert summary["navigations"] == 1
+        assert summary["dns"] == 10
+        assert summary["ttfb"] == 100
+        assert summary["dom_processing"] == 250
+        assert summary["resources"] == 1
+        
+        with open(tracer.export(str(tmp_path)), encoding="utf-8") as f:
+            trace = json.load(f)
+        assert {event["ph"] for event in trace["traceEvents"]} == {"M", "X"}
+
+
+# --- pytest 外掛：每個測試一份時間軸，並在報告中加入摘要表格 ---
+
+def pytest_addoption(parser):
+    parser.addoption("--no-ui-trace", action="store_true", default=False,
+                     help="停用 UI 測試的效能追蹤")
+
+
+def pytest_configure(config):
+    config._ui_trace_summaries = []
+
+
+@pytest.fixture(autouse=True)
+def ui_trace(request):
+    """為每個測試建立追蹤器，測試結束後輸出時間軸"""
+    if request.config.getoption("--no-ui-trace"):
+        yield None
+        return
+    
+    tracer = start_trace(request.node.nodeid)
+    try:
+        yield tracer
+    finally:
+        stop_trace()
+        # 只有實際操作瀏覽器的測試才輸出
+        if any(event["cat"] == "webdriver" for event in tracer.events):
+            path = tracer.export()
+            request.config._ui_trace_summaries.append((request.node.nodeid, path, tracer.summary()))
+
+
+def _summary_table_html(summaries, report_dir: str) -> str:
+    header = "".join(f"<th>{label}</th>" for _, label in SUMMARY_COLUMNS)
+    rows = "".join(
+        f"<tr><td><a href=\"{os.path.relpath(path, report_dir)}\">{nodeid}</a></td>"
+        + "".join(f"<td>{summary[key]}</td>" for key, _ in SUMMARY_COLUMNS)
+        + "</tr>"
+        for nodeid, path, summary in summaries
+    )
+    return (f"<h2>UI 效能追蹤摘要</h2><table><thead><tr><th>測試</th>{header}</tr></thead>"
+            f"<tbody>{rows}</tbody></table>")
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_html_results_summary(prefix, summary, postfix, session):
+    summaries = session.config._ui_trace_summaries
+    if summaries:
+        report_dir = os.path.dirname(os.path.abspath(session.config.getoption("htmlpath") or "reports/report.html"))
+        postfix.append(_summary_table_html(
+            [(nodeid, os.path.abspath(path), summary) for nodeid, path, summary in summaries], report_dir
+        ))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    summaries = getattr(config, "_ui_trace_summaries", [])
+    if not summaries:
+        return
+    
+    terminalreporter.section("UI 效能追蹤")
+    for nodeid, path, summary in summaries:
+        terminalreporter.write_line(
+            f"{nodeid}: 總計 {summary['total']} ms，TTFB {summary['ttfb']} ms，"
+            f"DOM 處理 {summary['dom_processing']} ms，固定等待 {summary['wait']} ms，"
+            f"WebDriver {summary['webdriver']} ms / {summary['webdriver_calls']} 次 -> {path}"
+        )